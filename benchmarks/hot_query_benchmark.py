@@ -0,0 +1,107 @@
+"""
+Сравнение частых запросов через ORM и через crud.hot_queries (Core).
+Запускается против базы из DATABASE_URL:
+
+    python -m benchmarks.hot_query_benchmark --iterations 2000
+
+Для каждого запроса выводит время и процессорное время на вызов.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, delete
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from crud import Postgres
+from crud.hot_queries import (
+    fetch_current_survey,
+    fetch_user_profile,
+    insert_messages,
+)
+from models import Message, Survey, User
+from utils.config import DATABASE_URL
+
+
+async def measure(name, call, iterations):
+    # Прогрев: компиляция запросов и соединения пула
+    for _ in range(10):
+        await call()
+
+    started, cpu_started = time.perf_counter(), time.process_time()
+    for _ in range(iterations):
+        await call()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    print(
+        f"{name:>28}: {elapsed / iterations * 1e6:8.1f} us/call, "
+        f"{cpu / iterations * 1e6:8.1f} us CPU/call"
+    )
+
+
+async def main(iterations: int):
+    engine = create_async_engine(DATABASE_URL)
+    db = Postgres(async_sessionmaker(engine, expire_on_commit=False))
+    user_id = f"bench-{uuid.uuid4().hex[:12]}"
+    since = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    await db.add_entity({"userid": user_id, "language": "ru"}, User)
+    await db.add_entity({"userid": user_id, "headache_today": "да"}, Survey)
+
+    def message():
+        return {"user_id": user_id, "content": "bench"}
+
+    try:
+        await measure(
+            "user profile (ORM)",
+            lambda: db.get_entity_parameter(User, {"userid": user_id}),
+            iterations,
+        )
+        await measure(
+            "user profile (Core)",
+            lambda: fetch_user_profile(db, user_id),
+            iterations,
+        )
+        await measure(
+            "current survey (ORM)",
+            lambda: db.get_entity_parameter(
+                Survey,
+                custom_filter=and_(
+                    Survey.userid == user_id, Survey.created_at >= since
+                ),
+            ),
+            iterations,
+        )
+        await measure(
+            "current survey (Core)",
+            lambda: fetch_current_survey(db, user_id, since),
+            iterations,
+        )
+        await measure(
+            "message insert (ORM)",
+            lambda: db.add_entity(message(), Message),
+            iterations,
+        )
+        await measure(
+            "message insert (Core)",
+            lambda: insert_messages(db, [message()]),
+            iterations,
+        )
+    finally:
+        async with db.async_session() as session:
+            for model, column in (
+                (Message, Message.user_id),
+                (Survey, Survey.userid),
+                (User, User.userid),
+            ):
+                await session.execute(delete(model).where(column == user_id))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
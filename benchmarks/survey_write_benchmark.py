@@ -0,0 +1,100 @@
+"""
+Сравнение записи ежедневного опроса: legacy (SELECT + UPDATE) и upsert
+(один запрос). Запускается против базы из DATABASE_URL:
+
+    python -m benchmarks.survey_write_benchmark --users 20 --answers 6
+
+Считает SQL-запросы и коммиты на один ответ и общее время.
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from sqlalchemy import delete, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from crud import Postgres
+from models import Survey
+from services.survey_service import (
+    SURVEY_INDEX_FIELDS,
+    apply_survey_fields,
+    survey_fields_from_message,
+    update_survey_data_legacy,
+)
+from utils.config import DATABASE_URL
+
+
+ANSWERS = {
+    1: "да",
+    2: "нет",
+    3: "7",
+    4: "голова",
+    5: "висок",
+    6: "пульсирующая",
+}
+
+
+async def run_upsert(db, user_id, message):
+    await apply_survey_fields(db, user_id, survey_fields_from_message(message))
+
+
+async def run_mode(engine, db, name, write, users, answers):
+    counters = {"statements": 0, "commits": 0}
+
+    def on_execute(*args):
+        counters["statements"] += 1
+
+    def on_commit(*args):
+        counters["commits"] += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+    event.listen(engine.sync_engine, "commit", on_commit)
+
+    user_ids = [f"bench-{uuid.uuid4().hex[:12]}" for _ in range(users)]
+    indexes = list(SURVEY_INDEX_FIELDS)[:answers]
+    started = time.perf_counter()
+    try:
+        # Пользователи отвечают параллельно, ответы одного - по порядку
+        async def answer_all(user_id):
+            for index in indexes:
+                message = {"index": index, "text": ANSWERS[index]}
+                await write(db, user_id, message)
+
+        await asyncio.gather(*(answer_all(user_id) for user_id in user_ids))
+    finally:
+        elapsed = time.perf_counter() - started
+        event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+        event.remove(engine.sync_engine, "commit", on_commit)
+        async with db.async_session() as session:
+            await session.execute(
+                delete(Survey).where(Survey.userid.in_(user_ids))
+            )
+            await session.commit()
+
+    total = users * len(indexes)
+    print(
+        f"{name:>7}: {total} answers in {elapsed:.3f}s "
+        f"({total / elapsed:.0f}/s), "
+        f"{counters['statements'] / total:.2f} statements/answer, "
+        f"{counters['commits'] / total:.2f} commits/answer"
+    )
+
+
+async def main(users: int, answers: int):
+    engine = create_async_engine(DATABASE_URL)
+    db = Postgres(async_sessionmaker(engine, expire_on_commit=False))
+    try:
+        await run_mode(
+            engine, db, "legacy", update_survey_data_legacy, users, answers
+        )
+        await run_mode(engine, db, "upsert", run_upsert, users, answers)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--answers", type=int, default=6)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.answers))
@@ -1 +1 @@
-from .crud import Postgres
+from .crud import Postgres, UnitOfWorkError, get_session_stats
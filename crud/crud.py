@@ -1,59 +1,231 @@
-from typing import Optional, Union, Any, Type
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
+from typing import Optional, Union, Any, Sequence, Type
 from sqlalchemy.future import select
-from models.models import Database, Base
-from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import insert
+from models.models import Database, Base, User
+from sqlalchemy import Row, and_, delete, inspect, tuple_, update
+from utils.admission_control import OverloadedError, db_limiter
 from utils.logging_config import get_logger
+from utils.unit_of_work import current_unit_of_work
+from utils.user_profile_cache import user_profiles
 
 
 logger = get_logger(name="crud")
 
+# Сколько открыто сессий (взято соединений из пула) и сделано коммитов
+session_stats = {"sessions": 0, "commits": 0, "units_of_work": 0}
+
+
+def get_session_stats() -> dict:
+    return dict(session_stats)
+
+
+class UnitOfWorkError(Exception):
+    """
+    Операция внутри единицы работы завершилась ошибкой: вся транзакция
+    откатилась, включая операции, уже вернувшие результат.
+    """
+
+
+class UnitOfWork:
+    """
+    Одна сессия и одна транзакция на все обращения к Postgres в рамках
+    запроса. Сессия открывается при первом обращении, коммит выполняется
+    при выходе из unit_of_work. Ошибка в любой операции откатывает
+    всю транзакцию: следующие операции не выполняются, а выход из
+    unit_of_work бросает UnitOfWorkError, даже если CRUD-метод ошибку
+    перехватил.
+    """
+
+    def __init__(self, db: "Postgres"):
+        self.db = db
+        self._session = None
+        self._stack = AsyncExitStack()
+        self.error: Optional[BaseException] = None
+
+    def owns(self, session) -> bool:
+        return session is self._session
+
+    @asynccontextmanager
+    async def session(self):
+        if self.error is not None:
+            raise UnitOfWorkError(
+                "Unit of work is rolled back after an earlier error"
+            ) from self.error
+        if self._session is None:
+            await self._stack.enter_async_context(db_limiter.slot())
+            self._session = await self._stack.enter_async_context(
+                self.db.async_session()
+            )
+            session_stats["sessions"] += 1
+        try:
+            yield self._session
+        except Exception as e:
+            self.error = e
+            await self._session.rollback()
+            raise
+
+    async def complete(self):
+        try:
+            if self.error is not None:
+                raise UnitOfWorkError(
+                    f"Unit of work rolled back: {self.error}"
+                ) from self.error
+            if self._session is not None:
+                await self._session.commit()
+                session_stats["commits"] += 1
+        finally:
+            await self._stack.aclose()
+
+    async def abort(self):
+        try:
+            if self._session is not None:
+                await self._session.rollback()
+        finally:
+            await self._stack.aclose()
+
 
 class Postgres(Database):
     def __init__(self, async_session):
         self.async_session = async_session
 
+    @asynccontextmanager
+    async def session(self, admit: bool = True):
+        """
+        Сессия БД с учётом ограничения числа одновременных обращений.
+        Внутри unit_of_work используется общая сессия единицы работы.
+        admit=False - без ограничения (фоновая запись, которая сама
+        ограничивает число своих соединений).
+        """
+        unit = current_unit_of_work.get()
+        if unit is not None and unit.db is self:
+            async with unit.session() as session:
+                yield session
+            return
+
+        async with db_limiter.slot() if admit else nullcontext():
+            async with self.async_session() as session:
+                session_stats["sessions"] += 1
+                yield session
+
+    async def commit(self, session) -> None:
+        """
+        Фиксирует изменения. Внутри unit_of_work изменения только
+        отправляются в БД, коммит - при завершении единицы работы.
+        """
+        unit = current_unit_of_work.get()
+        if unit is not None and unit.owns(session):
+            await session.flush()
+            return
+        await session.commit()
+        session_stats["commits"] += 1
+
+    @asynccontextmanager
+    async def unit_of_work(self):
+        """
+        Объединяет обращения к БД внутри блока в одну транзакцию.
+        Вложенный unit_of_work становится частью внешнего.
+        """
+        if current_unit_of_work.get() is not None:
+            yield current_unit_of_work.get()
+            return
+
+        unit = UnitOfWork(self)
+        token = current_unit_of_work.set(unit)
+        session_stats["units_of_work"] += 1
+        try:
+            yield unit
+        except BaseException:
+            await unit.abort()
+            raise
+        else:
+            await unit.complete()
+        finally:
+            current_unit_of_work.reset(token)
+
     async def add_entity(
         self,
         entity_data: Union[dict, Base],
         model_class: type[Base],
     ) -> None:
         try:
-            async with self.async_session() as session:
+            async with self.session() as session:
                 if isinstance(entity_data, dict):
                     entity = model_class(**entity_data)
                 else:
                     entity = entity_data
                 session.add(entity)
-                await session.commit()
+                await self.commit(session)
                 await session.refresh(entity)
-                return entity
+            if model_class is User:
+                await user_profiles.invalidate(entity.userid)
+            return entity
+        except OverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error adding entity: {e}")
             return None
 
+    async def add_entity_if_not_exists(
+        self, entity_data: dict, model_class: type[Base]
+    ) -> bool:
+        try:
+            async with self.session() as session:
+                result = await session.execute(
+                    insert(model_class)
+                    .values(**entity_data)
+                    .on_conflict_do_nothing()
+                )
+                await self.commit(session)
+            return result.rowcount > 0
+        except OverloadedError:
+            raise
+        except Exception as e:
+            logger.error(f"Error adding entity: {e}")
+            return False
+
     from sqlalchemy import select, and_
 
     async def get_entity_parameter(
         self,
         model_class: type[Base],
         filters: Optional[dict] = None,
+        parameter: Optional[Union[str, Sequence[str]]] = None,
         custom_filter: Optional[Any] = None,
-    ) -> Optional[Base]:
+    ) -> Optional[Union[Base, Row, Any]]:
+        """
+        Без parameter возвращает первую подходящую запись целиком.
+        С parameter выбираются только указанные столбцы: для одного имени
+        возвращается значение, для списка имён - строка (Row) без создания
+        ORM-объекта.
+        """
         try:
-            async with self.async_session() as session:
-                query = select(model_class)
+            async with self.session() as session:
+                if parameter is None:
+                    query = select(model_class)
+                elif isinstance(parameter, str):
+                    query = select(getattr(model_class, parameter))
+                else:
+                    query = select(
+                        *(getattr(model_class, name) for name in parameter)
+                    )
 
                 if filters:
                     query = query.filter_by(**filters)
 
-                if custom_filter:
+                if custom_filter is not None:
                     query = query.where(
                         custom_filter
                     )  # Используем .where для добавления условия
 
-                result = await session.execute(query)
-                entity = result.scalars().first()
-                return entity
+                result = await session.execute(query.limit(1))
+                if parameter is None:
+                    return result.scalars().first()
+                if isinstance(parameter, str):
+                    return result.scalar()
+                return result.first()
+        except OverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error fetching entity parameter: {e}")
             return None
@@ -62,20 +234,24 @@ class Postgres(Database):
         self, model_class: Type[Base], filters: Optional[dict] = None
     ) -> Optional[list[Base]]:
         try:
-            async with self.async_session() as session:
+            async with self.session() as session:
                 result = await session.execute(
                     select(model_class).filter_by(**filters)
                 )
                 return result.scalars().all()
+        except OverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error fetching entities parameter: {e}")
             return None
 
     async def get_entities(self, model_class: type) -> Optional[list]:
         try:
-            async with self.async_session() as session:
+            async with self.session() as session:
                 result = await session.execute(select(model_class))
                 return result.scalars().all()
+        except OverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error fetching entities: {e}")
             return None
@@ -88,15 +264,19 @@ class Postgres(Database):
         model_class: type[Base],
     ) -> None:
         try:
-            async with self.async_session() as session:
+            async with self.session() as session:
                 entity = await session.get(model_class, entity_id)
                 if entity:
                     setattr(entity, parameter, value)
-                    await session.commit()
+                    await self.commit(session)
+                    if model_class is User:
+                        await user_profiles.invalidate(entity_id)
                 else:
                     logger.error(
                         f"Entity with id {entity_id} not found in {model_class.__name__}"
                     )
+        except OverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error updating entity parameter: {e}")
 
@@ -104,14 +284,145 @@ class Postgres(Database):
         self, entity_id: Union[str, tuple], model_class: type[Base]
     ) -> None:
         try:
-            async with self.async_session() as session:
+            async with self.session() as session:
                 entity = await session.get(model_class, entity_id)
                 if entity:
                     await session.delete(entity)
-                    await session.commit()
+                    await self.commit(session)
+                    if model_class is User:
+                        await user_profiles.invalidate(entity_id)
                 else:
                     logger.error(
                         f"Entity with id {entity_id} not found in {model_class.__name__}"
                     )
+        except OverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error deleting entity: {e}")
+
+    async def _invalidate_profiles(
+        self, model_class: type[Base], user_ids
+    ) -> None:
+        if model_class is User:
+            for user_id in set(user_ids):
+                await user_profiles.invalidate(user_id)
+
+    async def add_entities(
+        self, entities_data: list[dict], model_class: type[Base]
+    ) -> int:
+        """
+        Добавляет несколько записей одним многострочным INSERT
+        в одной транзакции. Возвращает число добавленных записей.
+        """
+        if not entities_data:
+            return 0
+        try:
+            async with self.session() as session:
+                await session.execute(insert(model_class), entities_data)
+                await self.commit(session)
+            await self._invalidate_profiles(
+                model_class, (data.get("userid") for data in entities_data)
+            )
+            return len(entities_data)
+        except OverloadedError:
+            raise
+        except Exception as e:
+            logger.error(f"Error adding entities: {e}")
+            return 0
+
+    async def upsert_entities(
+        self,
+        entities_data: list[dict],
+        model_class: type[Base],
+        update_fields: Optional[list[str]] = None,
+    ) -> int:
+        """
+        Добавляет записи, а при совпадении первичного ключа обновляет
+        update_fields (по умолчанию - все переданные поля, кроме ключа).
+        Возвращает число добавленных и обновлённых записей.
+        """
+        if not entities_data:
+            return 0
+        primary_key = [
+            column.name for column in inspect(model_class).primary_key
+        ]
+        if update_fields is None:
+            update_fields = [
+                field for field in entities_data[0] if field not in primary_key
+            ]
+        try:
+            stmt = insert(model_class).values(entities_data)
+            if update_fields:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=primary_key,
+                    set_={
+                        field: stmt.excluded[field] for field in update_fields
+                    },
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=primary_key)
+
+            async with self.session() as session:
+                result = await session.execute(stmt)
+                await self.commit(session)
+            await self._invalidate_profiles(
+                model_class, (data.get("userid") for data in entities_data)
+            )
+            return result.rowcount
+        except OverloadedError:
+            raise
+        except Exception as e:
+            logger.error(f"Error upserting entities: {e}")
+            return 0
+
+    async def update_entities_parameters(
+        self, entities_data: list[dict], model_class: type[Base]
+    ) -> int:
+        """
+        Обновляет несколько записей за один запрос. Каждый словарь содержит
+        первичный ключ записи и новые значения параметров.
+        Возвращает число переданных записей.
+        """
+        if not entities_data:
+            return 0
+        try:
+            async with self.session() as session:
+                await session.execute(update(model_class), entities_data)
+                await self.commit(session)
+            await self._invalidate_profiles(
+                model_class, (data.get("userid") for data in entities_data)
+            )
+            return len(entities_data)
+        except OverloadedError:
+            raise
+        except Exception as e:
+            logger.error(f"Error updating entities parameters: {e}")
+            return 0
+
+    async def delete_entities(
+        self, entity_ids: list[Union[str, tuple]], model_class: type[Base]
+    ) -> int:
+        """
+        Удаляет записи по списку первичных ключей одним DELETE.
+        Возвращает число удалённых записей.
+        """
+        if not entity_ids:
+            return 0
+        primary_key = inspect(model_class).primary_key
+        if len(primary_key) == 1:
+            condition = primary_key[0].in_(entity_ids)
+        else:
+            condition = tuple_(*primary_key).in_(entity_ids)
+        try:
+            async with self.session() as session:
+                result = await session.execute(
+                    delete(model_class).where(condition)
+                )
+                await self.commit(session)
+            await self._invalidate_profiles(model_class, entity_ids)
+            return result.rowcount
+        except OverloadedError:
+            raise
+        except Exception as e:
+            logger.error(f"Error deleting entities: {e}")
+            return 0
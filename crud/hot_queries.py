@@ -0,0 +1,88 @@
+"""
+Частые запросы (на каждое сообщение) на уровне SQLAlchemy Core.
+
+Запросы построены один раз при импорте, значения передаются через
+bindparam. Скомпилированный SQL хранится в собственном кэше, который
+не вытесняется остальными запросами. Результат - лёгкие строки Row
+без ORM-объектов и identity map.
+"""
+
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Row, bindparam, insert, select
+from crud.crud import Postgres
+from models import Message, Survey, User
+
+
+users = User.__table__
+surveys = Survey.__table__
+messages = Message.__table__
+
+# Кэш скомпилированных запросов этого модуля
+HOT_COMPILED_CACHE: dict = {}
+
+USER_PROFILE = (
+    select(users.c.language, users.c.role, users.c.reminder_time)
+    .where(users.c.userid == bindparam("userid"))
+    .limit(1)
+)
+
+CURRENT_SURVEY = (
+    select(surveys.c.survey_id, surveys.c.created_at)
+    .where(
+        surveys.c.userid == bindparam("userid"),
+        surveys.c.created_at >= bindparam("since"),
+    )
+    .order_by(surveys.c.created_at.desc())
+    .limit(1)
+)
+
+INSERT_MESSAGES = insert(messages)
+
+
+async def _execute(db: Postgres, statement, parameters, admit: bool = True):
+    async with db.session(admit=admit) as session:
+        # Соединение сессии: запрос идёт в её транзакции, минуя ORM
+        connection = await session.connection()
+        result = await connection.execute(
+            statement,
+            parameters,
+            execution_options={"compiled_cache": HOT_COMPILED_CACHE},
+        )
+        if statement.is_insert:
+            await db.commit(session)
+        return result
+
+
+async def fetch_user_profile(db: Postgres, user_id: str) -> Optional[Row]:
+    """
+    (language, role, reminder_time) пользователя или None, если его нет.
+    """
+    result = await _execute(db, USER_PROFILE, {"userid": user_id})
+    return result.first()
+
+
+async def fetch_current_survey(
+    db: Postgres, user_id: str, since: datetime
+) -> Optional[Row]:
+    """
+    (survey_id, created_at) последнего опроса пользователя, созданного
+    не раньше since.
+    """
+    result = await _execute(
+        db, CURRENT_SURVEY, {"userid": user_id, "since": since}
+    )
+    return result.first()
+
+
+async def insert_messages(
+    db: Postgres, messages_data: list[dict], admit: bool = True
+) -> int:
+    """
+    Добавляет сообщения одним запросом. Возвращает их число.
+    admit=False - минуя db_limiter (см. Postgres.session).
+    """
+    if not messages_data:
+        return 0
+    await _execute(db, INSERT_MESSAGES, messages_data, admit)
+    return len(messages_data)
@@ -1,5 +1,6 @@
 import json
 from models import User
+from services.user_profile_service import get_user_profile
 from utils.logging_config import get_logger
 
 
@@ -14,10 +15,8 @@ async def get_user_language(user_id, message_language, db):
             )
             return message_language
         else:
-            user_language = await db.get_entity_parameter(
-                User, {"userid": str(user_id)}, "language"
-            )
-            return user_language or "ru"
+            profile = await get_user_profile(db, user_id)
+            return (profile or {}).get("language") or "ru"
     except Exception as e:
         logger.error(f"Error getting user language for user_id {user_id}: {e}")
         return "ru"
@@ -8,7 +8,11 @@ from constants.assistants_answers_var import (
 from models import User
 from services.openai_service import send_to_gpt
 from services.save_message_to_db import save_message_to_db
-from services.survey_service import update_survey_data
+from services.survey_service import (
+    update_survey_data,
+    update_survey_data_many,
+)
+from services.user_profile_service import ensure_user_exists
 from services.user_registration_service import update_user_registration_data
 from utils.config import ASSISTANT_ID, ASSISTANT2_ID, ASSISTANT3_ID
 from utils.redis_client import (
@@ -17,12 +21,11 @@ from utils.redis_client import (
 )
 from crud import Postgres
 from services.audio_text_processor import process_audio_and_text
-import asyncio
 from utils.logging_config import get_logger
+from utils.task_supervisor import supervisor
 
 
 logger = get_logger(name="process_message")
-tasks = []
 
 
 async def safe_add_entity(db, user_data):
@@ -32,11 +35,19 @@ async def safe_add_entity(db, user_data):
         logger.error(f"Error adding user to database: {e}")
 
 
-async def safe_update_survey_data(db, user_id, gpt_response_content):
-    try:
-        await update_survey_data(db, user_id, gpt_response_content)
-    except Exception as e:
-        logger.error(f"Error in update_survey_data: {e}")
+async def save_user_answer(db: Postgres, user_id: str, message: dict):
+    """
+    Ответ пользователя на вопрос опроса - в базу опросов и в историю.
+    Прямые запросы к БД (legacy-режим опроса, запись сообщения без
+    write-behind) идут через одну сессию единицы работы. Это не общая
+    транзакция: актор опроса и очередь write-behind пишут своими
+    соединениями.
+    """
+    async with db.unit_of_work():
+        # Опрос первым: актор пишет своим соединением, пока сессия
+        # единицы работы ещё не занята
+        await update_survey_data(db, user_id, message)
+        await save_message_to_db(db, user_id, message, True)
 
 
 async def register_user_if_not_exists(db, user_id):
@@ -44,23 +55,19 @@ async def register_user_if_not_exists(db, user_id):
     Проверяет существование пользователя в фоне и добавляет, если его нет.
     """
     try:
-        # Проверка существующего пользователя
-        existing_user_task = asyncio.create_task(
-            db.get_entity_parameter(User, {"userid": str(user_id)})
-        )
-
-        # Ждём завершения проверки
-        existing_user = await existing_user_task
-        if not existing_user:
-            # Добавление пользователя в фоне
-            task = asyncio.create_task(
-                db.add_entity({"userid": str(user_id)}, User)
-            )
-            tasks.append(task)
+        await ensure_user_exists(db, user_id)
     except Exception as e:
         logger.error(f"Error during user registration: {e}")
 
 
+def get_message_language(user_id: str) -> str:
+    """
+    Язык распознавания голосовых сообщений пользователя. По нему же
+    начинается потоковое распознавание загружаемого клипа (server.py).
+    """
+    return "ru"
+
+
 async def process_user_message(user_id: str, message: dict, db: Postgres):
     """
     Обрабатывает ответ пользователя на основании его состояния (регистрация или опрос) с учетом истории диалога.
@@ -74,9 +81,14 @@ async def process_user_message(user_id: str, message: dict, db: Postgres):
     # регистрация пользователя по номеру телефона, если нет в базе users
 
     # Создаём задачу для проверки существующего пользователя
-    task = asyncio.create_task(register_user_if_not_exists(db, user_id))
-    tasks.append(task)
-    logger.info(f"message111: {message}")
+    await supervisor.spawn(
+        register_user_if_not_exists(db, user_id), "register_user"
+    )
+    # Аудио не логируем: это может быть весь клип целиком
+    logged = {
+        k: v for k, v in message.items() if k not in ("audio", "audio_stream")
+    }
+    logger.info(f"message111: {logged}")
     if is_registration:
         # Направляем запрос в GPT с инструкцией по регистрации
         instruction = ASSISTANT2_ID
@@ -98,9 +110,13 @@ async def process_user_message(user_id: str, message: dict, db: Postgres):
     dialogue_history = []
     logger.info(f"dialogue_history_begin: {dialogue_history}")
 
-    user_language = "ru"
+    user_language = get_message_language(user_id)
     text = await process_audio_and_text(message, user_language)
     logger.info(f"text: {text}")
+    # Аудио (memoryview из бинарных кадров) не сериализуется в JSON
+    # и не нужно ни в ответе, ни в истории
+    message["audio"] = None
+
     # Если текст не извлечен из аудио, возвращаем сообщение об ошибке
     if not text:
         if instruction == ASSISTANT3_ID:
@@ -123,17 +139,17 @@ async def process_user_message(user_id: str, message: dict, db: Postgres):
             }
 
     message["text"] = text
-    message["audio"] = None
     # Добавляем текущее сообщение пользователя в историю
     dialogue_history.append(
         {"role": "user", "content": json.dumps(message, ensure_ascii=False)}
     )
 
-    # Сохраняем сообщение пользователя в базу данных
-    task = asyncio.create_task(save_message_to_db(db, user_id, message, True))
-    tasks.append(task)
-
     if message["action"] == "all_in_one_message":
+        # Сохраняем сообщение пользователя в базу данных
+        await supervisor.spawn(
+            save_message_to_db(db, user_id, message, True), "save_message"
+        )
+
         gpt_response = await send_to_gpt(dialogue_history, instruction)
         # Добавляем ответ GPT в историю
         dialogue_history.append({"role": "assistant", "content": gpt_response})
@@ -142,12 +158,6 @@ async def process_user_message(user_id: str, message: dict, db: Postgres):
         try:
             gpt_response_content = json.loads(gpt_response)
             logger.info(f"gpt_response_type: {type(gpt_response_content)}")
-            gpt_response_for_update = gpt_response_content.get("data")
-            for message in gpt_response_for_update:
-                task = asyncio.create_task(
-                    safe_update_survey_data(db, user_id, message)
-                )
-                tasks.append(task)
         except json.JSONDecodeError as e:
             logger.error(f"Error decoding GPT response: {e}")
             return {
@@ -158,20 +168,27 @@ async def process_user_message(user_id: str, message: dict, db: Postgres):
                 "message": "Ошибка при обработке ответа от GPT",
             }
 
+        # Все ответы пакета - одним обновлением опроса
+        await supervisor.spawn(
+            update_survey_data_many(
+                db, user_id, gpt_response_content.get("data") or []
+            ),
+            "update_survey",
+        )
         return gpt_response_content
 
-    # Сохраняем сообщение пользователя в базу опросов
-    task = asyncio.create_task(safe_update_survey_data(db, user_id, message))
-    tasks.append(task)
+    # Сообщение пользователя - в историю и в базу опросов до запроса к GPT
+    await supervisor.spawn(
+        save_user_answer(db, user_id, message), "save_answer"
+    )
 
     # Отправляем запрос в GPT с текущей историей диалога
     gpt_response = await send_to_gpt(dialogue_history, instruction)
 
     # Сохраняем ответ GPT в базу данных
-    task = asyncio.create_task(
-        save_message_to_db(db, user_id, gpt_response, False)
+    await supervisor.spawn(
+        save_message_to_db(db, user_id, gpt_response, False), "save_message"
     )
-    tasks.append(task)
 
     # Добавляем ответ GPT в историю
     dialogue_history.append({"role": "assistant", "content": gpt_response})
@@ -223,10 +240,9 @@ async def process_user_message(user_id: str, message: dict, db: Postgres):
                             "fio": fio,
                             "birthdate": birthdate,
                         }
-                        task = asyncio.create_task(
-                            safe_add_entity(db, new_user_data)
+                        await supervisor.spawn(
+                            safe_add_entity(db, new_user_data), "add_user"
                         )
-                        tasks.append(task)
 
                         logger.info(
                             f"Created user {user_id} with fio: {fio} and birthdate: {birthdate}"
@@ -243,18 +259,18 @@ async def process_user_message(user_id: str, message: dict, db: Postgres):
                         "message": "Invalid data format for fio and birthdate",
                     }
             else:
-                task = asyncio.create_task(
+                await supervisor.spawn(
                     update_user_registration_data(
                         db, user_id, gpt_response_content
-                    )
+                    ),
+                    "update_registration",
                 )
-                tasks.append(task)
 
         else:
-            task = asyncio.create_task(
-                safe_update_survey_data(db, user_id, gpt_response_content)
+            await supervisor.spawn(
+                update_survey_data(db, user_id, gpt_response_content),
+                "update_survey",
             )
-            tasks.append(task)
 
     if "question" in gpt_response_content:
         # Получаем индекс текущего вопроса
@@ -1,13 +1,36 @@
 import logging
 import asyncio
-from fastapi import FastAPI
+import json
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from crud import Postgres
-from services.database import async_session
-from services.yandex_service import get_iam_token, refresh_iam_token
-from server import main as websocket_server
+from crud import Postgres, get_session_stats
+from services.auth_service import (
+    ConnectionAuth,
+    close_http_client,
+    get_token_cache_stats,
+)
+from services.database import async_session, get_pool_stats
+from services.history_service import decode_cursor, stream_chat_history
+from services.message_writer import message_writer
+from services.survey_service import survey_writer
+from services.transcoder_pool import transcoder_pool
+from services.yandex_service import (
+    close_yandex_client,
+    get_iam_token,
+    get_yandex_stats,
+    refresh_iam_token,
+)
+from server import main as websocket_server, connection_stats
+from utils.admission_control import get_admission_stats
+from utils.config import WS_WORKERS, TASK_DRAIN_TIMEOUT
+from utils.stt_cache import stt_cache
+from utils.task_supervisor import supervisor
+from utils.user_profile_cache import user_profiles
+from ws_workers import WorkerPool
 from utils.logging_config import get_logger
 
 
@@ -52,6 +75,9 @@ async def get_db() -> AsyncSession:
 
 db = Postgres(async_session)
 
+# Процессы WebSocket-сервера (если WS_WORKERS > 0)
+ws_pool = None
+
 
 class Message(BaseModel):
     user_id: str
@@ -76,16 +102,82 @@ async def startup_event():
         asyncio.create_task(
             run_task_safe(refresh_iam_token(), "refresh_iam_token")
         )
-        asyncio.create_task(
-            run_task_safe(websocket_server(), "websocket_server")
-        )
+        if WS_WORKERS > 0:
+            # WebSocket-сервер работает в отдельных процессах
+            global ws_pool
+            ws_pool = WorkerPool(WS_WORKERS)
+            ws_pool.start()
+        else:
+            asyncio.create_task(
+                run_task_safe(websocket_server(), "websocket_server")
+            )
 
     except Exception as e:
         logger.error(f"Error during startup event: {e}")
 
 
+@app.get("/metrics")
+async def metrics():
+    """
+    Внутренние метрики сервиса.
+    """
+    return {
+        "auth_token_cache": get_token_cache_stats(),
+        "admission": get_admission_stats(),
+        "db_pool": get_pool_stats(),
+        "db_sessions": get_session_stats(),
+        "background_tasks": supervisor.stats(),
+        "message_writer": message_writer.stats(),
+        "survey_writer": survey_writer.stats(),
+        "user_profile_cache": user_profiles.stats(),
+        "stt_cache": stt_cache.stats(),
+        "transcoder_pool": transcoder_pool.stats(),
+        "yandex": get_yandex_stats(),
+        "ws_server": (
+            ws_pool.stats()
+            if ws_pool
+            else [{"worker": "in-process", **connection_stats}]
+        ),
+    }
+
+
+@app.get("/history")
+async def chat_history(
+    before: Optional[str] = None,
+    limit: Optional[int] = None,
+    authorization: Optional[str] = Header(None),
+):
+    """
+    История чата пользователя от новых сообщений к старым, по сообщению
+    в строке (NDJSON). before - курсор сообщения, с которого продолжить.
+    """
+    token = (authorization or "").removeprefix("Bearer ").strip()
+    user_id = await ConnectionAuth().authenticate(token) if token else None
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    if before:
+        try:
+            decode_cursor(before)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def lines():
+        async for message in stream_chat_history(db, user_id, before, limit):
+            yield json.dumps(message, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.on_event("shutdown")
 async def shutdown_event():
+    if ws_pool:
+        await ws_pool.stop()
+    # Дожидаемся фоновых записей в БД, чтобы не потерять данные
+    await supervisor.drain(TASK_DRAIN_TIMEOUT)
+    await message_writer.stop()
+    await transcoder_pool.stop()
+    await close_http_client()
+    await close_yandex_client()
     await logger.shutdown()
 
 
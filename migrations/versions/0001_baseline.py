@@ -0,0 +1,105 @@
+"""baseline schema
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+Схема до появления миграций. Для существующей базы не применяется,
+а отмечается командой alembic stamp 0001_baseline.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("userid", sa.String(), primary_key=True),
+        sa.Column("username", sa.String()),
+        sa.Column("firstname", sa.String()),
+        sa.Column("lastname", sa.String()),
+        sa.Column("fio", sa.String()),
+        sa.Column("birthdate", sa.Date()),
+        sa.Column("menstrual_cycle", sa.String()),
+        sa.Column("country", sa.String()),
+        sa.Column("city", sa.String()),
+        sa.Column("medication", sa.String()),
+        sa.Column("medication_name", sa.String()),
+        sa.Column("const_medication", sa.String()),
+        sa.Column("const_medication_name", sa.String()),
+        sa.Column("reminder_time", sa.Time()),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column("language", sa.String()),
+        sa.Column("role", sa.String()),
+    )
+    op.create_table(
+        "survey",
+        sa.Column(
+            "survey_id", sa.Integer(), primary_key=True, autoincrement=True
+        ),
+        sa.Column(
+            "userid",
+            sa.String(),
+            sa.ForeignKey("users.userid", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column("headache_today", sa.String()),
+        sa.Column("medicament_today", sa.String()),
+        sa.Column("pain_intensity", sa.String()),
+        sa.Column("pain_area", sa.String()),
+        sa.Column("area_detail", sa.String()),
+        sa.Column("pain_type", sa.String()),
+        sa.Column("comments", sa.String()),
+    )
+    op.create_table(
+        "messages",
+        sa.Column("id", sa.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", sa.String()),
+        sa.Column("content", sa.String()),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column("is_created_by_user", sa.Boolean()),
+        sa.Column("front_id", sa.String()),
+    )
+    op.create_index("ix_messages_id", "messages", ["id"])
+    op.create_index("ix_messages_user_id", "messages", ["user_id"])
+
+
+def downgrade():
+    op.drop_table("messages")
+    op.drop_table("survey")
+    op.drop_table("users")
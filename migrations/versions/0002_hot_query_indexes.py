@@ -0,0 +1,55 @@
+"""composite indexes for hot queries
+
+Revision ID: 0002_hot_query_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-17 00:00:00
+
+- survey (userid, created_at): поиск текущего опроса пользователя
+  (survey_service, crud.hot_queries.CURRENT_SURVEY, UPSERT опроса).
+- messages (user_id, created_at, id): постраничная история чата
+  (history_service), порядок совпадает с курсором.
+
+Индексы создаются CONCURRENTLY, без блокировки записи в таблицы.
+"""
+
+from alembic import op
+
+
+revision = "0002_hot_query_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_survey_userid_created_at",
+            "survey",
+            ["userid", "created_at"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_messages_user_id_created_at_id",
+            "messages",
+            ["user_id", "created_at", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_messages_user_id_created_at_id",
+            table_name="messages",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_survey_userid_created_at",
+            table_name="survey",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -1,10 +1,11 @@
 import uuid
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Union, Optional, Type, Any
+from typing import Union, Optional, Sequence, Type, Any
 
 from sqlalchemy import (
     Column,
+    Index,
     BigInteger,
     String,
     Integer,
@@ -102,6 +103,10 @@ class Survey(Base):
     """
 
     __tablename__ = "survey"
+    __table_args__ = (
+        # Поиск текущего опроса пользователя
+        Index("ix_survey_userid_created_at", "userid", "created_at"),
+    )
 
     survey_id = Column(Integer, primary_key=True, autoincrement=True)
     userid = Column(
@@ -156,6 +161,12 @@ class Survey(Base):
 class Message(Base):
 
     __tablename__ = "messages"
+    __table_args__ = (
+        # Постраничная история чата
+        Index(
+            "ix_messages_user_id_created_at_id", "user_id", "created_at", "id"
+        ),
+    )
 
     id = Column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
@@ -204,21 +215,41 @@ class Database(ABC):
         """
         pass
 
+    @abstractmethod
+    async def add_entity_if_not_exists(
+        self, entity_data: dict, model_class: type[Base]
+    ) -> bool:
+        """
+        Add a new entity unless one with the same primary key exists
+        (INSERT ... ON CONFLICT DO NOTHING).
+
+        :param entity_data: Data of the entity to add.
+        :param model_class: The class of the model corresponding to the entity.
+
+        :return: True if the entity was inserted.
+        """
+        pass
+
     @abstractmethod
     async def get_entity_parameter(
         self,
         model_class: type[Base],
         filters: Optional[dict] = None,
-        parameter: Optional[str] = None,
+        parameter: Optional[Union[str, Sequence[str]]] = None,
+        custom_filter: Optional[Any] = None,
     ) -> Optional[Union[Base, Any]]:
         """
         Get a specific parameter of an entity.
 
-        :param entity_id: The ID of the entity.
-        :param parameter: The name of the parameter.
         :param model_class: The class of the model corresponding to the entity.
+        :param filters: A dictionary of filters to apply.
+        :param parameter: The name of the parameter, or a list of names.
+        Only these columns are selected. Without it the whole entity is
+        returned.
+        :param custom_filter: An additional SQL condition.
 
-        :return: The value of the specified parameter.
+        :return: The value of the specified parameter, a row with the values
+        of the specified parameters, or the entity.
         """
         pass
 
@@ -281,3 +312,66 @@ class Database(ABC):
         :return: None
         """
         pass
+
+    @abstractmethod
+    async def add_entities(
+        self, entities_data: list[dict], model_class: type[Base]
+    ) -> int:
+        """
+        Add several entities in one transaction.
+
+        :param entities_data: A list of dictionaries with the entities' data.
+        :param model_class: The class of the model corresponding to the entities.
+
+        :return: The number of added entities.
+        """
+        pass
+
+    @abstractmethod
+    async def upsert_entities(
+        self,
+        entities_data: list[dict],
+        model_class: type[Base],
+        update_fields: Optional[list[str]] = None,
+    ) -> int:
+        """
+        Add several entities, updating the existing ones on primary key
+        conflict.
+
+        :param entities_data: A list of dictionaries with the entities' data.
+        :param model_class: The class of the model corresponding to the entities.
+        :param update_fields: Fields to update on conflict. Defaults to all
+        given fields except the primary key.
+
+        :return: The number of added or updated entities.
+        """
+        pass
+
+    @abstractmethod
+    async def update_entities_parameters(
+        self, entities_data: list[dict], model_class: type[Base]
+    ) -> int:
+        """
+        Update parameters of several entities in one transaction.
+
+        :param entities_data: A list of dictionaries, each with the primary key
+        of an entity and the new values of its parameters.
+        :param model_class: The class of the model corresponding to the entities.
+
+        :return: The number of updated entities.
+        """
+        pass
+
+    @abstractmethod
+    async def delete_entities(
+        self, entity_ids: list[Union[int, tuple]], model_class: type[Base]
+    ) -> int:
+        """
+        Delete several entities in one transaction.
+
+        :param entity_ids: The IDs of the entities to delete.
+        :param model_class: The class of the model corresponding to the entities.
+
+        :return: The number of deleted entities.
+        """
+        pass
@@ -0,0 +1,172 @@
+"""
+Проверка планов частых запросов: каждый из них должен читать таблицу
+через ожидаемый индекс с условием по его первой колонке (Index Cond).
+Запускается против базы из DATABASE_URL после миграций, например в CI:
+
+    python -m scripts.check_query_plans
+
+Последовательное сканирование запрещается (enable_seqscan = off), поэтому
+план не зависит от объёма данных в базе. Отсутствие Seq Scan ещё ничего
+не говорит: без подходящего индекса Postgres выберет полный обход любого
+другого индекса. Поэтому проверяется имя индекса и то, что по его первой
+колонке идёт поиск, а не фильтр. При нарушении код выхода - 1.
+"""
+
+import asyncio
+import json
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import delete, select, text, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+from crud.hot_queries import CURRENT_SURVEY, USER_PROFILE
+from models import Message, Survey, User
+from services.history_service import _history_query, encode_cursor
+from services.survey_service import build_survey_upsert
+from utils.config import DATABASE_URL
+
+
+NOW = datetime.now(timezone.utc)
+USER_ID = "plan-check-user"
+
+
+# Индексы из моделей и миграций (первичные ключи - по имени Postgres)
+USERS_PKEY = "users_pkey"
+SURVEY_PKEY = "survey_pkey"
+SURVEY_BY_USER = "ix_survey_userid_created_at"
+MESSAGES_PKEY = "messages_pkey"
+MESSAGES_BY_ID = "ix_messages_id"
+MESSAGES_HISTORY = "ix_messages_user_id_created_at_id"
+
+
+def hot_queries() -> dict:
+    """
+    Запросы crud и survey_service, которые выполняются на каждое сообщение:
+    запрос, допустимые индексы и первая колонка, по которой идёт поиск.
+    """
+    cursor = encode_cursor(NOW, uuid.uuid4())
+    return {
+        "user profile": (
+            USER_PROFILE.params(userid=USER_ID),
+            {USERS_PKEY},
+            "userid",
+        ),
+        "user by id (crud)": (
+            select(User).filter_by(userid=USER_ID),
+            {USERS_PKEY},
+            "userid",
+        ),
+        "current survey": (
+            CURRENT_SURVEY.params(userid=USER_ID, since=NOW),
+            {SURVEY_BY_USER},
+            "userid",
+        ),
+        "survey upsert": (
+            build_survey_upsert(USER_ID, {"pain_type": "x"}, NOW),
+            {SURVEY_BY_USER},
+            "userid",
+        ),
+        "survey update (crud)": (
+            update(Survey)
+            .where(Survey.survey_id == 1, Survey.userid == USER_ID)
+            .values(pain_type="x"),
+            {SURVEY_PKEY},
+            "survey_id",
+        ),
+        "survey delete (crud)": (
+            delete(Survey).where(
+                Survey.survey_id == 1, Survey.userid == USER_ID
+            ),
+            {SURVEY_PKEY},
+            "survey_id",
+        ),
+        "history first page": (
+            _history_query(USER_ID, None, 50),
+            {MESSAGES_HISTORY},
+            "user_id",
+        ),
+        "history next page": (
+            _history_query(USER_ID, cursor, 50),
+            {MESSAGES_HISTORY},
+            "user_id",
+        ),
+        "message by id (crud)": (
+            select(Message).filter_by(id=uuid.uuid4()),
+            {MESSAGES_PKEY, MESSAGES_BY_ID},
+            "id",
+        ),
+    }
+
+
+def plan_nodes(plan: dict) -> list[dict]:
+    nodes = [plan]
+    for child in plan.get("Plans", []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+
+def check_plan(plan: dict, indexes: set[str], column: str) -> Optional[str]:
+    """
+    Ошибка плана или None: нет Seq Scan, и хотя бы один узел читает
+    один из indexes с Index Cond по column.
+    """
+    nodes = plan_nodes(plan)
+    seq_scans = [
+        node.get("Relation Name", "?")
+        for node in nodes
+        if node.get("Node Type") == "Seq Scan"
+    ]
+    if seq_scans:
+        return f"Seq Scan on {', '.join(seq_scans)}"
+
+    condition = re.compile(rf"\b{re.escape(column)}\b")
+    used = []
+    for node in nodes:
+        index = node.get("Index Name")
+        if index is None:
+            continue
+        used.append(index)
+        if index in indexes and condition.search(node.get("Index Cond", "")):
+            return None
+    expected = " or ".join(sorted(indexes))
+    if not used:
+        return f"no index scan, expected {expected}"
+    return (
+        f"expected {expected} with Index Cond on {column}, "
+        f"got {', '.join(used)}"
+    )
+
+
+async def main() -> int:
+    engine = create_async_engine(DATABASE_URL)
+    failures = 0
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SET enable_seqscan = off"))
+            for name, (statement, indexes, column) in hot_queries().items():
+                sql = statement.compile(
+                    dialect=postgresql.dialect(),
+                    compile_kwargs={"literal_binds": True},
+                )
+                result = await connection.exec_driver_sql(
+                    f"EXPLAIN (FORMAT JSON) {sql}"
+                )
+                plan = result.scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                error = check_plan(plan[0]["Plan"], indexes, column)
+                if error:
+                    failures += 1
+                    print(f"FAIL {name}: {error}")
+                else:
+                    print(f"ok   {name}")
+    finally:
+        await engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,20 +1,44 @@
 import asyncio
-import httpx
+import functools
 import websockets
 import json
 from crud import Postgres
 from handlers.process_message import (
+    get_message_language,
     process_user_message,
     register_user_if_not_exists,
 )
+from services.audio_text_processor import recognition_language
+from services.audio_upload import AudioUpload
+from services.auth_service import (
+    ConnectionAuth,
+    verify_token_with_auth_server,
+)
 from services.create_realtime_session import create_realtime_session
+from services.history_service import get_chat_history_page, get_page_limit
+from services.jwt_verifier import refresh_signing_keys
+from services.message_writer import message_writer
+from services.survey_drafts import sweep_survey_drafts
 from services.survey_service import update_survey_data_live_barsik
-from utils.config import URL_VERIFY_TOKEN
+from utils.admission_control import OverloadedError
+from utils.config import (
+    AUTH_VERIFY_MODE,
+    DB_POOL_WARMUP,
+    MESSAGE_WRITE_BEHIND,
+    SURVEY_WRITE_MODE,
+    USER_PROFILE_CACHE_REDIS,
+    WS_HOST,
+    WS_PORT,
+    WS_MAX_INFLIGHT_REQUESTS,
+)
 from utils.logging_config import get_logger
-from services.database import async_session
+from utils.task_supervisor import supervisor
+from utils.user_profile_cache import user_profiles
+from services.database import async_session, warm_up_pool
 import ftfy
 
 from services.statistics_service import generate_statistics_file
+from services.streaming_stt import start_streaming_recognition
 from utils.redis_client import (
     save_registration_status,
     delete_user_dialogue_history,
@@ -25,28 +49,12 @@ db = Postgres(async_session)
 
 logger = get_logger(name="server")
 
-
-async def verify_token_with_auth_server(token):
-    """
-    Проверка токена через внешний сервис аутентификации.
-    """
-    try:
-        url = URL_VERIFY_TOKEN
-        headers = {"Authorization": f"Bearer {token}"}
-        logger.info(f"Token: {token}")
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.get(url, headers=headers)
-            if response.status_code == 200:
-                logger.info(f"responseJWT: {response.json()}")
-                return response.json()  # Возвращаем данные пользователя
-            else:
-                logger.error(
-                    f"Error: {response.status_code} - {response.text}"
-                )
-                return None
-    except Exception as e:
-        logger.error(f"Error verifying token: {e}")
-        return None
+# Счётчики WebSocket-сервера текущего процесса
+connection_stats = {
+    "active_connections": 0,
+    "total_connections": 0,
+    "frames_received": 0,
+}
 
 
 async def handle_command(action, user_id, database: Postgres):
@@ -103,6 +111,8 @@ async def handle_command(action, user_id, database: Postgres):
                 "action": "export_stats",
                 "data": {"file_json": stats},
             }
+        except OverloadedError:
+            raise
         except Exception as e:
             logger.error(f"Error generating export stats: {e}")
             return {
@@ -114,235 +124,491 @@ async def handle_command(action, user_id, database: Postgres):
             }
 
 
+def overloaded_response(error: OverloadedError, action=None) -> dict:
+    """
+    Ответ при перегрузке зависимости: клиенту стоит повторить запрос
+    через retry_after секунд.
+    """
+    return {
+        "type": "response",
+        "status": "error",
+        "action": action,
+        "error": "overloaded",
+        "message": "Server is overloaded. Please retry later.",
+        "retry_after": error.retry_after,
+    }
+
+
+async def dispatch_frame(data: dict, user_id: str, reply):
+    """
+    Выполняет действие из кадра WebSocket для аутентифицированного пользователя.
+    Ответы отправляются через reply(response).
+    """
+    try:
+        # Обращения к БД в рамках кадра - одна сессия и одна транзакция
+        async with db.unit_of_work():
+            await _dispatch_frame(data, user_id, reply)
+    finally:
+        await abort_unused_audio_stream(data)
+
+
+async def abort_unused_audio_stream(data: dict):
+    """
+    Останавливает перекодирование загруженного клипа, если обработчик
+    сообщения его не забрал (другое действие или ошибка до обработки).
+    """
+    message_data = data.get("data")
+    if isinstance(message_data, dict):
+        stream = message_data.pop("audio_stream", None)
+        if stream is not None:
+            await stream.abort()
+
+
+async def _dispatch_frame(data: dict, user_id: str, reply):
+    action = data.get("action")
+    message_type = data.get("type")
+
+    # if action == "initial_chat":
+    #     response = await handle_command(action, user_id, db)
+    #     await websocket.send(json.dumps(response, ensure_ascii=False))
+
+    if action == "initial_voice_chat":
+        try:
+            await supervisor.spawn(
+                register_user_if_not_exists(db, user_id), "register_user"
+            )
+            response = await create_realtime_session()
+            # Извлекаем client_secret
+            client_secret = response.get("client_secret")
+
+            # Формируем ответ в нужном формате
+            response_data = {
+                "type": "system",
+                "status": "success",
+                "action": "initial_voice_chat",
+                "data": {
+                    "client_secret": {
+                        "value": client_secret.get("value"),
+                        "expires_at": client_secret.get("expires_at"),
+                    }
+                },
+            }
+
+            await reply(response_data)
+
+        except OverloadedError as overloaded_error:
+            await reply(overloaded_response(overloaded_error, action))
+            return
+        except Exception as command_error:
+            logger.error(
+                f"Error handling command 'initial_voice_chat': {command_error}"
+            )
+            await reply(
+                {
+                    "type": "response",
+                    "status": "error",
+                    "error": "command_error",
+                    "message": "Failed to process the 'initial_voice_chat' command.",
+                }
+            )
+            return
+
+    if action == "save_voice_chat_results":
+        try:
+            message_data = data.get("data", {})
+            # Корректируем только строковые значения в словаре
+            message_data_fixed = {
+                key: (
+                    ftfy.fix_text(value)
+                    if isinstance(value, str)
+                    else str(value)
+                )
+                for key, value in message_data.items()
+            }
+            logger.info(
+                f"message_data_save_voice_chat_results: {message_data_fixed}"
+            )
+            await supervisor.spawn(
+                register_user_if_not_exists(db, user_id), "register_user"
+            )
+
+            await update_survey_data_live_barsik(
+                db, user_id, message_data_fixed
+            )
+            await reply(
+                {
+                    "type": "response",
+                    "status": "success",
+                    "action": "save_voice_chat_results",
+                }
+            )
+
+        except OverloadedError as overloaded_error:
+            await reply(overloaded_response(overloaded_error, action))
+            return
+        except Exception as command_error:
+            logger.error(
+                f"Error handling command 'save_voice_chat_results': {command_error}"
+            )
+            await reply(
+                {
+                    "type": "response",
+                    "status": "error",
+                    "error": "command_error",
+                    "message": "Failed to process the 'save_voice_chat_results' command.",
+                }
+            )
+            return
+
+    # Обработка команды export_stats
+    if action == "export_stats":
+        try:
+            response = await handle_command(action, user_id, db)
+            await reply(response)
+        except OverloadedError as overloaded_error:
+            await reply(overloaded_response(overloaded_error, action))
+            return
+        except Exception as command_error:
+            logger.error(
+                f"Error handling command 'export_stats': {command_error}"
+            )
+            await reply(
+                {
+                    "type": "response",
+                    "status": "error",
+                    "error": "command_error",
+                    "message": "Failed to process the 'export_stats' command.",
+                }
+            )
+            return
+
+    # Постраничная история чата
+    if action == "get_history":
+        params = data.get("data") or {}
+        try:
+            get_page_limit(params.get("limit"))
+        except ValueError as limit_error:
+            await reply(
+                {
+                    "type": "response",
+                    "status": "error",
+                    "action": "get_history",
+                    "error": "invalid_limit",
+                    "message": str(limit_error),
+                }
+            )
+            return
+        try:
+            page = await get_chat_history_page(
+                db, user_id, params.get("before"), params.get("limit")
+            )
+            await reply(
+                {
+                    "type": "response",
+                    "status": "success",
+                    "action": "get_history",
+                    "data": page,
+                }
+            )
+        except ValueError as cursor_error:
+            await reply(
+                {
+                    "type": "response",
+                    "status": "error",
+                    "action": "get_history",
+                    "error": "invalid_cursor",
+                    "message": str(cursor_error),
+                }
+            )
+        except OverloadedError as overloaded_error:
+            await reply(overloaded_response(overloaded_error, action))
+        except Exception as command_error:
+            logger.error(
+                f"Error handling command 'get_history': {command_error}"
+            )
+            await reply(
+                {
+                    "type": "response",
+                    "status": "error",
+                    "error": "command_error",
+                    "message": "Failed to process the 'get_history' command.",
+                }
+            )
+        return
+
+    # Обработка сообщений
+    if message_type == "message" or (
+        message_type == "command" and action == "all_in_one_message"
+    ):
+        try:
+            message_data = data.get("data", {})
+            message_data["action"] = action
+
+            if "text" in message_data:
+                fixed_text = ftfy.fix_text(message_data["text"])
+                message_data["text"] = fixed_text
+
+            response = await process_user_message(user_id, message_data, db)
+            await reply(response)
+            logger.info(f"Response_sent: {response}")
+        except OverloadedError as overloaded_error:
+            await reply(overloaded_response(overloaded_error, action))
+            return
+        except Exception as message_error:
+            logger.error(f"Error processing user message: {message_error}")
+            await reply(
+                {
+                    "type": "response",
+                    "status": "error",
+                    "error": "message_processing_error",
+                    "message": "Failed to process the user message.",
+                }
+            )
+
+
+async def send_response(websocket, response: dict, request_id=None):
+    """
+    Отправляет ответ клиенту. В конвейерном режиме ответ помечается
+    request_id исходного кадра.
+    """
+    if request_id is not None:
+        response = {**response, "request_id": request_id}
+    await websocket.send(json.dumps(response, ensure_ascii=False))
+
+
+async def run_pipelined_frame(data, user_id, reply, inflight_slots):
+    """
+    Выполняет кадр конвейерного режима как отдельную задачу.
+    """
+    try:
+        await dispatch_frame(data, user_id, reply)
+    except websockets.exceptions.ConnectionClosed as e:
+        logger.warning(f"Connection closed before response was sent: {e}")
+    except Exception as e:
+        logger.error(f"Error processing pipelined frame: {e}")
+        try:
+            await reply(
+                {
+                    "type": "response",
+                    "status": "error",
+                    "error": "message_error",
+                    "message": str(e),
+                }
+            )
+        except websockets.exceptions.ConnectionClosed:
+            pass
+    finally:
+        inflight_slots.release()
+
+
 async def handle_connection(websocket, path):
     """
     Основная логика обработки сообщений по WebSocket.
+    Токен проверяется при первом кадре (или в кадре "auth"), после чего
+    user_id привязан к соединению до истечения срока действия токена.
+
+    Кадры с полем request_id обрабатываются конкурентно (не более
+    WS_MAX_INFLIGHT_REQUESTS одновременно), ответы помечаются тем же
+    request_id и могут приходить в произвольном порядке. Кадры без
+    request_id обрабатываются последовательно, как и раньше.
+
+    Аудио можно передавать без base64: JSON-заголовок с полем
+    "binary_audio": {"size": <байт>, "format": "aac" | "opus"}, за которым
+    следуют бинарные кадры с самими байтами. Когда получено size байт,
+    кадр-заголовок обрабатывается с data.audio в виде memoryview.
+    При включённом STT_STREAMING_BACKEND кадры перекодируются и
+    передаются бэкенду распознавания по мере поступления, на том же
+    языке, что и для целого клипа (get_message_language).
     """
+    auth = ConnectionAuth()
+    inflight_slots = asyncio.Semaphore(WS_MAX_INFLIGHT_REQUESTS)
+    inflight_tasks = set()
+    pending_upload = None
+    connection_stats["active_connections"] += 1
+    connection_stats["total_connections"] += 1
+
+    async def submit(data, user_id, reply):
+        if data.get("request_id") is None:
+            await dispatch_frame(data, user_id, reply)
+            return
+
+        # Конвейерный режим: ждём свободный слот и запускаем кадр
+        # отдельной задачей, не блокируя чтение следующих кадров
+        await inflight_slots.acquire()
+        task = asyncio.create_task(
+            run_pipelined_frame(data, user_id, reply, inflight_slots)
+        )
+        inflight_tasks.add(task)
+        task.add_done_callback(inflight_tasks.discard)
+
     try:
         async for message in websocket:
+            connection_stats["frames_received"] += 1
+            request_id = None
             try:
+                if isinstance(message, bytes):
+                    if pending_upload is None:
+                        await send_response(
+                            websocket,
+                            {
+                                "type": "response",
+                                "status": "error",
+                                "error": "unexpected_binary_frame",
+                                "message": "Binary frame received without an audio header.",
+                            },
+                        )
+                        continue
+
+                    upload, data, user_id, reply, stream = pending_upload
+                    try:
+                        upload.feed(message)
+                    except ValueError as upload_error:
+                        pending_upload = None
+                        if stream:
+                            await stream.abort()
+                        await reply(
+                            {
+                                "type": "response",
+                                "status": "error",
+                                "error": "invalid_audio_upload",
+                                "message": str(upload_error),
+                            }
+                        )
+                        continue
+
+                    if stream:
+                        try:
+                            await stream.feed(message)
+                        except Exception as stream_error:
+                            # Клип будет распознан целиком после загрузки
+                            logger.warning(
+                                f"Streaming recognition stopped: {stream_error}"
+                            )
+                            await stream.abort()
+                            stream = None
+                            pending_upload = (*pending_upload[:4], None)
+
+                    if upload.complete:
+                        pending_upload = None
+                        message_data = data.get("data") or {}
+                        message_data["audio"] = upload.getbuffer()
+                        if stream:
+                            # Текст дождётся обработчик сообщения
+                            message_data["audio_stream"] = stream
+                        data["data"] = message_data
+                        await submit(data, user_id, reply)
+                    continue
+
+                if pending_upload is not None:
+                    # JSON-кадр посреди загрузки: незавершённый клип отбрасываем
+                    logger.warning(
+                        "Audio upload interrupted by a JSON frame, "
+                        f"{pending_upload[0].received} of "
+                        f"{pending_upload[0].size} bytes received"
+                    )
+                    if pending_upload[-1]:
+                        await pending_upload[-1].abort()
+                    pending_upload = None
+
                 data = json.loads(message)
                 token = data.get("token")
-                user_data = None
+                action = data.get("action")
+                request_id = data.get("request_id")
+                reply = functools.partial(
+                    send_response, websocket, request_id=request_id
+                )
 
-                # Обработка токена
+                # Обработка токена: проверяем его один раз на соединение
                 if token:
                     try:
-                        user_data = await asyncio.create_task(
-                            verify_token_with_auth_server(token)
-                        )
+                        user_id = await auth.authenticate(token)
                     except Exception as token_error:
                         logger.error(f"Error verifying token: {token_error}")
-                        response = {
-                            "type": "response",
-                            "status": "error",
-                            "error": "token_verification_error",
-                            "message": "Failed to verify authentication token.",
-                        }
-                        await websocket.send(
-                            json.dumps(response, ensure_ascii=False)
+                        await reply(
+                            {
+                                "type": "response",
+                                "status": "error",
+                                "error": "token_verification_error",
+                                "message": "Failed to verify authentication token.",
+                            }
                         )
                         continue
 
-                    if not user_data:
-                        response = {
+                    if not user_id:
+                        await reply(
+                            {
+                                "type": "response",
+                                "status": "error",
+                                "error": "invalid_token",
+                                "message": "Invalid or expired JWT token. Please re-authenticate.",
+                            }
+                        )
+                        continue
+                elif auth.is_bound():
+                    user_id = auth.user_id
+                elif auth.user_id:
+                    # Токен соединения истёк, нужна повторная аутентификация
+                    auth.reset()
+                    await reply(
+                        {
                             "type": "response",
                             "status": "error",
                             "error": "invalid_token",
                             "message": "Invalid or expired JWT token. Please re-authenticate.",
                         }
-                        await websocket.send(
-                            json.dumps(response, ensure_ascii=False)
-                        )
-                        continue
-                else:
-                    logger.warning("Token not provided in the request.")
-                    response = {
-                        "type": "response",
-                        "status": "error",
-                        "error": "missing_token",
-                        "message": "Authentication token is required but was not provided.",
-                    }
-                    await websocket.send(
-                        json.dumps(response, ensure_ascii=False)
                     )
                     continue
-
-                # Проверяем наличие user_data
-                if user_data:
-                    user_id = user_data["result"]["phone"]
-                    action = data.get("action")
-                    message_type = data.get("type")
                 else:
-                    response = {
-                        "type": "response",
-                        "status": "error",
-                        "error": "missing_user_data",
-                        "message": "User data not available. Cannot extract user_id.",
-                    }
-                    await websocket.send(
-                        json.dumps(response, ensure_ascii=False)
+                    logger.warning("Token not provided in the request.")
+                    await reply(
+                        {
+                            "type": "response",
+                            "status": "error",
+                            "error": "missing_token",
+                            "message": "Authentication token is required but was not provided.",
+                        }
                     )
                     continue
 
-                # if action == "initial_chat":
-                #     response = await handle_command(action, user_id, db)
-                #     await websocket.send(json.dumps(response, ensure_ascii=False))
-
-                if action == "initial_voice_chat":
-                    try:
-                        asyncio.create_task(  # noqa
-                            register_user_if_not_exists(db, user_id)  # noqa
-                        )  # noqa
-                        response = await create_realtime_session()
-                        # Извлекаем client_secret
-                        client_secret = response.get("client_secret")
-
-                        # Формируем ответ в нужном формате
-                        response_data = {
-                            "type": "system",
+                # Явная аутентификация соединения
+                if action == "auth":
+                    await reply(
+                        {
+                            "type": "response",
                             "status": "success",
-                            "action": "initial_voice_chat",
-                            "data": {
-                                "client_secret": {
-                                    "value": client_secret.get("value"),
-                                    "expires_at": client_secret.get(
-                                        "expires_at"
-                                    ),
-                                }
-                            },
+                            "action": "auth",
+                            "data": {"expires_at": int(auth.expires_at)},
                         }
+                    )
+                    continue
 
-                        await websocket.send(
-                            json.dumps(response_data, ensure_ascii=False)
-                        )
-
-                    except Exception as command_error:
-                        logger.error(
-                            f"Error handling command 'initial_voice_chat': {command_error}"
-                        )
-                        await websocket.send(
-                            json.dumps(
-                                {
-                                    "type": "response",
-                                    "status": "error",
-                                    "error": "command_error",
-                                    "message": "Failed to process the 'initial_voice_chat' command.",
-                                },
-                                ensure_ascii=False,
-                            )
-                        )
-                        continue
-
-                if action == "save_voice_chat_results":
-                    try:
-                        message_data = data.get("data", {})
-                        # Корректируем только строковые значения в словаре
-                        message_data_fixed = {
-                            key: (
-                                ftfy.fix_text(value)
-                                if isinstance(value, str)
-                                else str(value)
-                            )
-                            for key, value in message_data.items()
-                        }
-                        logger.info(
-                            f"message_data_save_voice_chat_results: {message_data_fixed}"
-                        )
-                        asyncio.create_task(  # noqa
-                            register_user_if_not_exists(db, user_id)  # noqa
-                        )  # noqa
-
-                        await update_survey_data_live_barsik(
-                            db, user_id, message_data_fixed
-                        )
-                        await websocket.send(
-                            json.dumps(
-                                {
-                                    "type": "response",
-                                    "status": "success",
-                                    "action": "save_voice_chat_results",
-                                },
-                                ensure_ascii=False,
-                            )
-                        )
-
-                    except Exception as command_error:
-                        logger.error(
-                            f"Error handling command 'save_voice_chat_results': {command_error}"
-                        )
-                        await websocket.send(
-                            json.dumps(
-                                {
-                                    "type": "response",
-                                    "status": "error",
-                                    "error": "command_error",
-                                    "message": "Failed to process the 'save_voice_chat_results' command.",
-                                },
-                                ensure_ascii=False,
-                            )
-                        )
-                        continue
-
-                # Обработка команды export_stats
-                if action == "export_stats":
+                # Бинарный режим: аудио придёт следующими бинарными кадрами
+                binary_audio = data.get("binary_audio")
+                if binary_audio:
                     try:
-                        response = await handle_command(action, user_id, db)
-                        await websocket.send(
-                            json.dumps(response, ensure_ascii=False)
+                        upload = AudioUpload(
+                            binary_audio.get("size"),
+                            binary_audio.get("format", "aac"),
                         )
-                    except Exception as command_error:
-                        logger.error(
-                            f"Error handling command 'export_stats': {command_error}"
-                        )
-                        await websocket.send(
-                            json.dumps(
-                                {
-                                    "type": "response",
-                                    "status": "error",
-                                    "error": "command_error",
-                                    "message": "Failed to process the 'export_stats' command.",
-                                },
-                                ensure_ascii=False,
-                            )
+                    except ValueError as upload_error:
+                        await reply(
+                            {
+                                "type": "response",
+                                "status": "error",
+                                "error": "invalid_audio_upload",
+                                "message": str(upload_error),
+                            }
                         )
                         continue
+                    # Распознавание начинается, пока клип ещё загружается
+                    stream = await start_streaming_recognition(
+                        recognition_language(get_message_language(user_id))
+                    )
+                    pending_upload = (upload, data, user_id, reply, stream)
+                    continue
 
-                # Обработка сообщений
-                if message_type == "message" or (
-                    message_type == "command"
-                    and action == "all_in_one_message"
-                ):
-                    try:
-                        message_data = data.get("data", {})
-                        message_data["action"] = action
-
-                        if "text" in message_data:
-                            fixed_text = ftfy.fix_text(message_data["text"])
-                            message_data["text"] = fixed_text
+                await submit(data, user_id, reply)
 
-                        response = await process_user_message(
-                            user_id, message_data, db
-                        )
-                        await websocket.send(
-                            json.dumps(response, ensure_ascii=False)
-                        )
-                        logger.info(f"Response_sent: {response}")
-                    except Exception as message_error:
-                        logger.error(
-                            f"Error processing user message: {message_error}"
-                        )
-                        await websocket.send(
-                            json.dumps(
-                                {
-                                    "type": "response",
-                                    "status": "error",
-                                    "error": "message_processing_error",
-                                    "message": "Failed to process the user message.",
-                                },
-                                ensure_ascii=False,
-                            )
-                        )
             except websockets.exceptions.ConnectionClosedError as e:
                 logger.warning(f"Connection closed unexpectedly: {e}")
                 break
@@ -350,36 +616,59 @@ async def handle_connection(websocket, path):
                 logger.error(
                     f"Error processing message: {message_processing_error}"
                 )
-                await websocket.send(
-                    json.dumps(
-                        {
-                            "type": "response",
-                            "status": "error",
-                            "error": "message_error",
-                            "message": str(message_processing_error),
-                        },
-                        ensure_ascii=False,
-                    )
+                await send_response(
+                    websocket,
+                    {
+                        "type": "response",
+                        "status": "error",
+                        "error": "message_error",
+                        "message": str(message_processing_error),
+                    },
+                    request_id=request_id,
                 )
     except websockets.exceptions.ConnectionClosedError as e:
         logger.warning(f"WebSocket connection closed unexpectedly: {e}")
     except Exception as e:
         logger.error(f"Unexpected error in WebSocket handler: {e}")
     finally:
+        if pending_upload and pending_upload[-1]:
+            await pending_upload[-1].abort()
+        # Даём завершиться начатым запросам (в них могут идти записи в БД)
+        if inflight_tasks:
+            await asyncio.gather(*inflight_tasks, return_exceptions=True)
+        connection_stats["active_connections"] -= 1
         logger.info("WebSocket connection handler finished.")
 
 
-async def main():
+async def main(reuse_port: bool = False):
+    """
+    Запускает WebSocket-сервер. reuse_port=True позволяет нескольким
+    процессам слушать один порт (см. ws_workers.py).
+    """
+    if DB_POOL_WARMUP:
+        await warm_up_pool()
+    if MESSAGE_WRITE_BEHIND:
+        message_writer.start(db)
+    if AUTH_VERIFY_MODE == "local":
+        # Ключи подписи для локальной проверки JWT загружаются и обновляются в фоне
+        asyncio.create_task(refresh_signing_keys())  # noqa
+    if SURVEY_WRITE_MODE == "redis":
+        # Перенос в Postgres черновиков опросов с истёкшим сроком
+        asyncio.create_task(sweep_survey_drafts(db))  # noqa
+    if USER_PROFILE_CACHE_REDIS:
+        # Изменения профилей в других процессах сбрасывают локальный кэш
+        asyncio.create_task(user_profiles.listen_invalidations())  # noqa
     try:
         # Увеличиваем время ожидания пинга (интервал и тайм-аут)
         server = await websockets.serve(
             handle_connection,
-            "0.0.0.0",
-            8083,
+            WS_HOST,
+            WS_PORT,
             ping_interval=60,  # Интервал между пингами (в секундах)
             ping_timeout=30,  # Время ожидания ответа на пинг (в секундах)
+            reuse_port=reuse_port,
         )
-        print("WebSocket server started on ws://0.0.0.0:8083")
+        print(f"WebSocket server started on ws://{WS_HOST}:{WS_PORT}")
         await server.wait_closed()
     except Exception as e:
         logger.error(f"Error starting WebSocket server: {e}")
@@ -6,29 +6,129 @@ import subprocess
 import tempfile
 from pydub import AudioSegment
 from pydub.exceptions import CouldntDecodeError
+from .audio_transcoder import TranscodeError, transcode_to_opus
+from .transcoder_pool import PoolUnavailableError, transcoder_pool
 from .yandex_service import recognize_speech
+from utils.admission_control import OverloadedError, stt_limiter
+from utils.config import AUDIO_TRANSCODE_MODE
 from utils.logging_config import get_logger
+from utils.stt_cache import stt_cache
 
 logger = get_logger(name="audio_text_processor")
 
 
+def recognition_language(user_language: str) -> str:
+    return "kk-KK" if user_language == "kk" else "ru-RU"
+
+
 async def process_audio(audio_content_encoded, user_language):
     """
     Обрабатывает аудио сообщение в фоне.
+    Принимает строку base64 либо сырые байты (bytes/memoryview) из
+    бинарных кадров WebSocket.
+    Повторно отправленный клип берётся из кэша распознавания без
+    перекодирования и обращения к STT.
+    При переполнении очереди к распознаванию бросает OverloadedError.
+    """
+    try:
+        if isinstance(audio_content_encoded, (bytes, bytearray, memoryview)):
+            # Бинарный кадр: байты уже готовы, base64 не нужен
+            audio_content = audio_content_encoded
+        else:
+            # Декодируем base64
+            audio_content = base64.b64decode(audio_content_encoded)
+            logger.info("Successfully decoded base64 audio content.")
+    except Exception as e:
+        logger.error(f"Error processing audio: {e}")
+        return None
+
+    lang = recognition_language(user_language)
+    cache_key = stt_cache.key(audio_content, lang)
+    text = await stt_cache.get(cache_key)
+    if text is not None:
+        logger.info(f"Speech recognition result from cache: {text}")
+        return text
+
+    async with stt_limiter.slot():
+        text = await _process_audio(audio_content, lang)
+    await stt_cache.set(cache_key, text)
+    return text
+
+
+async def process_streamed_audio(audio_stream, audio, user_language):
     """
+    Текст клипа, распознанного во время загрузки. Если потоковое
+    распознавание не удалось или начато на другом языке, клип
+    обрабатывается целиком.
+    """
+    if audio_stream.lang != recognition_language(user_language):
+        await audio_stream.abort()
+        return await process_audio(audio, user_language)
     try:
-        # Декодируем base64
-        audio_content = base64.b64decode(audio_content_encoded)
-        logger.info("Successfully decoded base64 audio content.")
+        text = await audio_stream.finish(audio)
+        logger.info(f"Streaming recognition result: {text}")
+        return text
+    except OverloadedError:
+        raise
+    except Exception as e:
+        logger.warning(f"Streaming recognition failed, retrying batch: {e}")
+        return await process_audio(audio, user_language)
+
+
+async def _process_audio(audio_content, lang):
+    try:
+        if AUDIO_TRANSCODE_MODE == "legacy":
+            ogg_content = _transcode_legacy(audio_content)
+        else:
+            ogg_content = await _transcode(audio_content)
 
-        # Сохраняем аудиоданные во временный файл
-        temp_input = tempfile.NamedTemporaryFile(delete=False, suffix=".aac")
+        # Распознавание речи
+        text = await recognize_speech(ogg_content, lang=lang)
+        logger.info(f"Speech recognition result: {text}")
+        return text
+
+    except Exception as e:
+        logger.error(f"Error processing audio: {e}")
+        return None
+
+
+async def _transcode(audio_content) -> bytes:
+    try:
+        if AUDIO_TRANSCODE_MODE == "pool":
+            try:
+                ogg_content = await transcoder_pool.transcode(audio_content)
+            except PoolUnavailableError:
+                # Пул не запустился в этом процессе - перекодируем каналом
+                ogg_content = await transcode_to_opus(audio_content)
+        else:
+            ogg_content = await transcode_to_opus(audio_content)
+        logger.info(
+            f"Successfully transcoded audio to OGG ({AUDIO_TRANSCODE_MODE})."
+        )
+        return ogg_content
+    except TranscodeError as e:
+        # Контейнеры, которые нельзя прочитать из канала (например, m4a
+        # с moov в конце файла), перекодируем через временные файлы
+        logger.warning(f"Transcoding failed, using temp files: {e}")
+        return await asyncio.to_thread(_transcode_legacy, audio_content)
+
+
+def _transcode_legacy(audio_content) -> bytes:
+    """
+    Прежний путь: AAC -> WAV через временные файлы, затем WAV -> OGG
+    через pydub. Блокирующий, оставлен для сравнения.
+    """
+    # Сохраняем аудиоданные во временный файл
+    temp_input = tempfile.NamedTemporaryFile(delete=False, suffix=".aac")
+    temp_output = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
+    temp_input.close()
+    temp_output.close()
+    try:
         with open(temp_input.name, "wb") as f:
             f.write(audio_content)
         logger.info(f"Saved AAC data to temporary file: {temp_input.name}")
 
         # Конвертация AAC в WAV с помощью ffmpeg
-        temp_output = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
         try:
             ffmpeg_command = [
                 "ffmpeg",
@@ -58,20 +158,14 @@ async def process_audio(audio_content_encoded, user_language):
         # Конвертируем в OGG
         ogg_io = io.BytesIO()
         audio.export(ogg_io, format="ogg", codec="libopus")
-        ogg_io.seek(0)
-        ogg_content = ogg_io.read()
         logger.info("Successfully converted audio to OGG format.")
-
-        # Распознавание речи
-        text = recognize_speech(
-            ogg_content, lang="kk-KK" if user_language == "kk" else "ru-RU"
-        )
-        logger.info(f"Speech recognition result: {text}")
-        return text
-
-    except Exception as e:
-        logger.error(f"Error processing audio: {e}")
-        return None
+        return ogg_io.getvalue()
+    finally:
+        for path in (temp_input.name, temp_output.name):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
 
 
 async def process_audio_and_text(message_data, user_language):
@@ -81,8 +175,19 @@ async def process_audio_and_text(message_data, user_language):
     tasks = []
     text_result = None
 
+    # Распознавание, начатое во время загрузки клипа
+    audio_stream = message_data.pop("audio_stream", None)
+
     # Если есть аудио, запускаем фоновую задачу на его обработку
-    if "audio" in message_data and message_data["audio"]:
+    if audio_stream is not None:
+        tasks.append(
+            asyncio.create_task(
+                process_streamed_audio(
+                    audio_stream, message_data.get("audio"), user_language
+                )
+            )
+        )
+    elif "audio" in message_data and message_data["audio"]:
         tasks.append(
             asyncio.create_task(
                 process_audio(message_data["audio"], user_language)
@@ -96,6 +201,8 @@ async def process_audio_and_text(message_data, user_language):
 
     # Логируем ошибки и собираем результаты
     for result in results:
+        if isinstance(result, OverloadedError):
+            raise result
         if isinstance(result, Exception):
             logger.error(f"Error in background task: {result}")
         else:
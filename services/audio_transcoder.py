@@ -0,0 +1,64 @@
+import asyncio
+from typing import Union
+from utils.config import AUDIO_TRANSCODE_TIMEOUT
+from utils.logging_config import get_logger
+
+
+logger = get_logger(name="audio_transcoder")
+
+# Вход - stdin, выход - stdout: 16 кГц, моно, Opus в контейнере OGG
+FFMPEG_OPUS_COMMAND = [
+    "ffmpeg",
+    "-loglevel",
+    "error",
+    "-i",
+    "pipe:0",
+    "-vn",
+    "-ac",
+    "1",
+    "-ar",
+    "16000",
+    "-c:a",
+    "libopus",
+    "-f",
+    "ogg",
+    "pipe:1",
+]
+
+
+class TranscodeError(Exception):
+    pass
+
+
+async def transcode_to_opus(
+    audio: Union[bytes, bytearray, memoryview],
+    timeout: float = AUDIO_TRANSCODE_TIMEOUT,
+) -> bytes:
+    """
+    Перекодирует аудио в OGG/Opus 16 кГц моно одним процессом ffmpeg
+    через каналы stdin/stdout, без временных файлов и без блокировки
+    event loop. Процесс, не уложившийся в timeout, завершается.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *FFMPEG_OPUS_COMMAND,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            process.communicate(audio), timeout
+        )
+    except asyncio.TimeoutError:
+        raise TranscodeError(f"ffmpeg did not finish in {timeout}s")
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    if process.returncode != 0 or not stdout:
+        raise TranscodeError(
+            f"ffmpeg exited with code {process.returncode}: "
+            f"{stderr.decode(errors='replace').strip()[-500:]}"
+        )
+    return stdout
@@ -0,0 +1,40 @@
+from utils.config import AUDIO_UPLOAD_MAX_BYTES
+
+
+class AudioUpload:
+    """
+    Сборка аудио, переданного бинарными кадрами WebSocket.
+
+    Размер клипа известен из JSON-заголовка, поэтому буфер выделяется один раз,
+    а кадры копируются прямо в него. Наружу отдаётся memoryview без
+    промежуточных копий и без base64.
+    """
+
+    def __init__(self, size: int, audio_format: str = "aac"):
+        if not isinstance(size, int) or size <= 0:
+            raise ValueError("Audio size must be a positive integer")
+        if size > AUDIO_UPLOAD_MAX_BYTES:
+            raise ValueError(
+                f"Audio size {size} exceeds limit {AUDIO_UPLOAD_MAX_BYTES}"
+            )
+        self.size = size
+        self.audio_format = audio_format
+        self.received = 0
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+
+    @property
+    def complete(self) -> bool:
+        return self.received == self.size
+
+    def feed(self, chunk: bytes) -> None:
+        end = self.received + len(chunk)
+        if end > self.size:
+            raise ValueError(
+                f"Received {end} bytes, but header declared {self.size}"
+            )
+        self._view[self.received : end] = chunk
+        self.received = end
+
+    def getbuffer(self) -> memoryview:
+        return self._view[: self.received]
@@ -0,0 +1,224 @@
+import asyncio
+import base64
+import hashlib
+import json
+import time
+from typing import Optional
+import httpx
+from utils.config import (
+    URL_VERIFY_TOKEN,
+    AUTH_SESSION_DEFAULT_TTL,
+    AUTH_TOKEN_CACHE_SIZE,
+    AUTH_TOKEN_CACHE_REDIS,
+    AUTH_VERIFY_MODE,
+)
+from services.jwt_verifier import (
+    LocalVerificationUnavailable,
+    verify_token_locally,
+)
+from utils.logging_config import get_logger
+from utils.redis_client import get_verified_token, save_verified_token
+from utils.ttl_cache import TTLCache
+
+
+logger = get_logger(name="auth_service")
+
+# Кэш проверенных токенов: ключ - sha256 токена, запись живёт до exp токена
+_token_cache = TTLCache(
+    maxsize=AUTH_TOKEN_CACHE_SIZE, ttl=AUTH_SESSION_DEFAULT_TTL
+)
+# Проверки, выполняющиеся прямо сейчас (single-flight)
+_inflight_verifications: dict[str, asyncio.Task] = {}
+_token_cache_counters = {
+    "local_verifications": 0,
+    "local_fallbacks": 0,
+    "redis_hits": 0,
+    "upstream_calls": 0,
+    "singleflight_joins": 0,
+}
+
+# Общий HTTP-клиент: соединение с сервисом аутентификации переиспользуется
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=10)
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def verify_token_with_auth_server(token):
+    """
+    Проверка токена через внешний сервис аутентификации.
+    """
+    try:
+        url = URL_VERIFY_TOKEN
+        headers = {"Authorization": f"Bearer {token}"}
+        logger.info(f"Token: {token}")
+        client = get_http_client()
+        response = await client.get(url, headers=headers)
+        if response.status_code == 200:
+            logger.info(f"responseJWT: {response.json()}")
+            return response.json()  # Возвращаем данные пользователя
+        else:
+            logger.error(f"Error: {response.status_code} - {response.text}")
+            return None
+    except Exception as e:
+        logger.error(f"Error verifying token: {e}")
+        return None
+
+
+def get_token_claims(token: str) -> dict:
+    """
+    Читает claims из JWT без проверки подписи (только для служебных целей,
+    например, чтобы узнать срок действия уже проверенного токена).
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))
+    except Exception:
+        return {}
+
+
+def get_token_expiry(token: str) -> float:
+    """
+    Возвращает момент истечения токена (unix time).
+    Если exp в токене нет, используется AUTH_SESSION_DEFAULT_TTL.
+    """
+    exp = get_token_claims(token).get("exp")
+    if isinstance(exp, (int, float)):
+        return float(exp)
+    return time.time() + AUTH_SESSION_DEFAULT_TTL
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def _load_verified_token(token: str, token_hash: str):
+    """
+    Проверяет токен локально (AUTH_VERIFY_MODE=local), а если это невозможно -
+    загружает результат из Redis или из сервиса аутентификации.
+    Результат кладётся в локальный кэш до истечения срока действия токена.
+    """
+    if AUTH_VERIFY_MODE == "local":
+        try:
+            user_data = verify_token_locally(token)
+            _token_cache_counters["local_verifications"] += 1
+            if user_data:
+                _token_cache.set(
+                    token_hash,
+                    user_data,
+                    get_token_expiry(token) - time.time(),
+                )
+            return user_data
+        except LocalVerificationUnavailable as e:
+            _token_cache_counters["local_fallbacks"] += 1
+            logger.warning(f"Falling back to remote token verification: {e}")
+
+    if AUTH_TOKEN_CACHE_REDIS:
+        user_data = await get_verified_token(token_hash)
+        if user_data:
+            _token_cache_counters["redis_hits"] += 1
+            _token_cache.set(
+                token_hash, user_data, get_token_expiry(token) - time.time()
+            )
+            return user_data
+
+    _token_cache_counters["upstream_calls"] += 1
+    user_data = await verify_token_with_auth_server(token)
+    if not user_data:
+        return None
+
+    ttl = get_token_expiry(token) - time.time()
+    _token_cache.set(token_hash, user_data, ttl)
+    if AUTH_TOKEN_CACHE_REDIS and ttl >= 1:
+        await save_verified_token(token_hash, user_data, int(ttl))
+    return user_data
+
+
+async def verify_token(token: str):
+    """
+    Проверка токена с кэшированием результата.
+    Одновременные проверки одного и того же токена объединяются в один
+    запрос к сервису аутентификации.
+    """
+    token_hash = hash_token(token)
+    user_data = _token_cache.get(token_hash)
+    if user_data is not None:
+        return user_data
+
+    task = _inflight_verifications.get(token_hash)
+    if task is not None:
+        _token_cache_counters["singleflight_joins"] += 1
+    else:
+        task = asyncio.ensure_future(_load_verified_token(token, token_hash))
+        _inflight_verifications[token_hash] = task
+        task.add_done_callback(
+            lambda _: _inflight_verifications.pop(token_hash, None)
+        )
+    # shield: отмена одного ожидающего не прерывает проверку для остальных
+    return await asyncio.shield(task)
+
+
+def get_token_cache_stats() -> dict:
+    return {
+        **_token_cache.stats(),
+        **_token_cache_counters,
+        "inflight": len(_inflight_verifications),
+    }
+
+
+class ConnectionAuth:
+    """
+    Состояние аутентификации одного WebSocket-соединения.
+
+    Токен проверяется один раз, после чего user_id привязывается к соединению
+    до истечения срока действия токена. Кадр с другим токеном проверяется заново.
+    """
+
+    def __init__(self):
+        self.token = None
+        self.user_id = None
+        self.expires_at = None
+
+    def reset(self):
+        self.token = None
+        self.user_id = None
+        self.expires_at = None
+
+    def is_bound(self, token: Optional[str] = None) -> bool:
+        if self.user_id is None:
+            return False
+        if token is not None and token != self.token:
+            return False
+        if self.expires_at is not None and time.time() >= self.expires_at:
+            return False
+        return True
+
+    async def authenticate(self, token: str) -> Optional[str]:
+        """
+        Возвращает user_id для токена, обращаясь к сервису аутентификации
+        только если токен ещё не привязан к соединению.
+        """
+        if self.is_bound(token):
+            return self.user_id
+
+        user_data = await verify_token(token)
+        if not user_data:
+            self.reset()
+            return None
+
+        self.token = token
+        self.user_id = user_data["result"]["phone"]
+        self.expires_at = get_token_expiry(token)
+        return self.user_id
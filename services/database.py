@@ -1,11 +1,118 @@
+import asyncio
+import time
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
     AsyncSession,
 )
-from utils.config import DATABASE_URL
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from utils.config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_PREPARED_STATEMENT_CACHE_SIZE,
+)
+from utils.logging_config import get_logger
+
+
+logger = get_logger(name="database")
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, считающий выдачи соединений и время их ожидания.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def connect(self):
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+        wait = time.monotonic() - started
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return connection
+
+    def stats(self) -> dict:
+        return {
+            "pool_size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait": (
+                round(self.total_wait / self.checkouts, 4)
+                if self.checkouts
+                else 0.0
+            ),
+            "max_wait": round(self.max_wait, 4),
+        }
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+
+# Кэш подготовленных запросов диалекта asyncpg задаётся параметром URL
+database_url = make_url(DATABASE_URL).update_query_dict(
+    {"prepared_statement_cache_size": str(DB_PREPARED_STATEMENT_CACHE_SIZE)}
+)
+engine = create_async_engine(
+    database_url,
+    echo=False,
+    poolclass=InstrumentedPool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args={"statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+)
 async_session = async_sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
 )
+
+
+def get_pool_stats() -> dict:
+    return engine.pool.stats()
+
+
+async def warm_up_pool(size: int = DB_POOL_SIZE):
+    """
+    Заранее открывает size соединений, чтобы первые запросы после
+    запуска не тратили время на установку соединения.
+    """
+    started = time.monotonic()
+    connections = await asyncio.gather(
+        *(engine.connect() for _ in range(size)), return_exceptions=True
+    )
+    opened = [conn for conn in connections if not isinstance(conn, Exception)]
+    await asyncio.gather(*(conn.close() for conn in opened))
+    if len(opened) < size:
+        logger.error(
+            f"DB pool warm-up opened {len(opened)} of {size} connections: "
+            f"{next(c for c in connections if isinstance(c, Exception))}"
+        )
+    else:
+        logger.info(
+            f"DB pool warmed up with {size} connections in "
+            f"{time.monotonic() - started:.2f}s"
+        )
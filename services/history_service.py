@@ -1,27 +1,162 @@
+import base64
 import json
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from sqlalchemy import select, tuple_
 from crud import Postgres
 from models import Message
+from utils.config import (
+    HISTORY_PAGE_SIZE,
+    HISTORY_MAX_PAGE_SIZE,
+    HISTORY_STREAM_BATCH,
+)
 from utils.logging_config import get_logger
 
 logger = get_logger(name="history_service")
 
+messages = Message.__table__
 
-async def generate_chat_history(user_id, db: Postgres):
+
+def encode_cursor(created_at: datetime, message_id) -> str:
+    """
+    Курсор истории: позиция сообщения по (created_at, id).
+    """
+    raw = f"{created_at.isoformat()}|{message_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        created_at, message_id = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        )
+        return datetime.fromisoformat(created_at), uuid.UUID(message_id)
+    except Exception:
+        raise ValueError("Invalid history cursor")
+
+
+def _history_query(user_id: str, before: Optional[str], limit: Optional[int]):
+    """
+    Сообщения пользователя от новых к старым, начиная до курсора before.
+    """
+    query = (
+        select(
+            messages.c.id,
+            messages.c.content,
+            messages.c.created_at,
+            messages.c.is_created_by_user,
+        )
+        .where(messages.c.user_id == user_id)
+        .order_by(messages.c.created_at.desc(), messages.c.id.desc())
+    )
+    if before:
+        query = query.where(
+            tuple_(messages.c.created_at, messages.c.id)
+            < tuple_(*decode_cursor(before))
+        )
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def _serialize(row) -> dict:
+    try:
+        content = json.loads(row.content)
+    except (TypeError, json.JSONDecodeError):
+        content = row.content
+    return {
+        "id": str(row.id),
+        "content": content,
+        "created_at": row.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "is_created_by_user": row.is_created_by_user,
+        "cursor": encode_cursor(row.created_at, row.id),
+    }
+
+
+def get_page_limit(limit: Optional[int]) -> int:
+    """
+    Размер страницы: по умолчанию HISTORY_PAGE_SIZE, не больше
+    HISTORY_MAX_PAGE_SIZE. Нечисловой limit - ValueError.
+    """
+    if not limit:
+        return HISTORY_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid history limit")
+    return max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+
+
+async def get_chat_history_page(
+    db: Postgres,
+    user_id: str,
+    before: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> dict:
+    """
+    Страница истории: не больше limit сообщений старше курсора before.
+    next_cursor - курсор для следующей страницы или None, если она последняя.
+    """
+    limit = get_page_limit(limit)
+    async with db.session() as session:
+        connection = await session.connection()
+        result = await connection.execute(
+            _history_query(user_id, before, limit + 1)
+        )
+        rows = result.all()
+
+    page = [_serialize(row) for row in rows[:limit]]
+    return {
+        "messages": page,
+        "next_cursor": page[-1]["cursor"] if len(rows) > limit else None,
+    }
+
+
+async def stream_chat_history(
+    db: Postgres,
+    user_id: str,
+    before: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> AsyncIterator[dict]:
+    """
+    Отдаёт историю по одному сообщению, читая её страницами по
+    HISTORY_STREAM_BATCH строк по ключу (created_at, id). Соединение и
+    слот db_limiter берутся только на время чтения страницы, поэтому
+    медленный клиент их не держит. Без limit отдаётся вся история.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        batch = HISTORY_STREAM_BATCH
+        if remaining is not None:
+            batch = min(batch, remaining)
+            remaining -= batch
+        async with db.session() as session:
+            connection = await session.connection()
+            result = await connection.execute(
+                _history_query(user_id, before, batch)
+            )
+            rows = result.all()
+
+        for row in rows:
+            yield _serialize(row)
+        if len(rows) < batch:
+            break
+        before = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+async def generate_chat_history(
+    user_id, db: Postgres, before: Optional[str] = None, limit=None
+):
+    """
+    Одна страница истории (список сообщений), см. get_chat_history_page.
+    """
     try:
-        user_messages = await db.get_entities_parameter(
-            Message, {"user_id": user_id}
+        page = await get_chat_history_page(db, user_id, before, limit)
+        logger.info(
+            f"user_messages: {len(page['messages'])} messages for {user_id}"
         )
-        data = [
-            {
-                "id": str(record.id),
-                "content": json.loads(record.content),
-                "created_at": record.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                "is_created_by_user": record.is_created_by_user,
-            }
-            for record in user_messages
-        ]
-        logger.info(f"user_messages: {data}")
-        return data
+        return page["messages"]
     except Exception as e:
         logger.error(f"Error generating chat history: {e}")
         return {"error": "Error generating chat history"}
@@ -0,0 +1,137 @@
+import asyncio
+import time
+from typing import Optional
+import httpx
+import jwt
+from utils.config import (
+    AUTH_JWKS_URL,
+    AUTH_JWKS_REFRESH_INTERVAL,
+    AUTH_JWT_SECRET,
+    AUTH_JWT_ALGORITHMS,
+    AUTH_JWT_AUDIENCE,
+    AUTH_JWT_ISSUER,
+    AUTH_JWT_PHONE_CLAIM,
+)
+from utils.logging_config import get_logger
+
+
+logger = get_logger(name="jwt_verifier")
+
+
+class LocalVerificationUnavailable(Exception):
+    """
+    Токен нельзя проверить локально (нет ключа, нет нужного claim и т.п.),
+    нужно обратиться к сервису аутентификации.
+    """
+
+
+class SigningKeyStore:
+    """
+    Кэш ключей подписи, загружаемых из JWKS и обновляемых в фоне.
+    """
+
+    def __init__(self, jwks_url: Optional[str]):
+        self.jwks_url = jwks_url
+        self.keys: dict = {}
+        self.refreshed_at: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+
+    async def refresh(self):
+        if not self.jwks_url:
+            return
+        async with self._refresh_lock:
+            try:
+                async with httpx.AsyncClient(timeout=10) as client:
+                    response = await client.get(self.jwks_url)
+                    response.raise_for_status()
+                    jwks = response.json()
+
+                keys = {}
+                for jwk_data in jwks.get("keys", []):
+                    try:
+                        keys[jwk_data.get("kid")] = jwt.PyJWK(jwk_data).key
+                    except jwt.PyJWKError as e:
+                        logger.error(f"Skipping unsupported JWK: {e}")
+                self.keys = keys
+                self.refreshed_at = time.time()
+                logger.info(f"Loaded {len(keys)} signing keys from JWKS")
+            except Exception as e:
+                logger.error(f"Error refreshing signing keys: {e}")
+
+    def get_key(self, kid: Optional[str]):
+        if kid in self.keys:
+            return self.keys[kid]
+        # JWKS с единственным ключом без kid
+        if kid is None and len(self.keys) == 1:
+            return next(iter(self.keys.values()))
+        return None
+
+
+signing_keys = SigningKeyStore(AUTH_JWKS_URL)
+
+
+async def refresh_signing_keys():
+    """
+    Периодически обновляет ключи подписи.
+    """
+    while True:
+        try:
+            await signing_keys.refresh()
+            await asyncio.sleep(AUTH_JWKS_REFRESH_INTERVAL)
+        except Exception as e:
+            logger.error(f"Error in signing keys refresh loop: {e}")
+            await asyncio.sleep(AUTH_JWKS_REFRESH_INTERVAL)
+
+
+def _get_verification_key(token: str):
+    if AUTH_JWT_SECRET:
+        return AUTH_JWT_SECRET
+
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+    except jwt.InvalidTokenError:
+        return None
+
+    key = signing_keys.get_key(kid)
+    if key is None:
+        raise LocalVerificationUnavailable(f"No signing key for kid={kid}")
+    return key
+
+
+def verify_token_locally(token: str) -> Optional[dict]:
+    """
+    Проверяет подпись и claims токена без обращения к сервису аутентификации.
+
+    Возвращает данные пользователя в формате ответа сервиса аутентификации
+    ({"result": {"phone": ...}}) или None, если токен недействителен.
+    """
+    key = _get_verification_key(token)
+    if key is None:
+        return None
+
+    try:
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=AUTH_JWT_ALGORITHMS,
+            audience=AUTH_JWT_AUDIENCE,
+            issuer=AUTH_JWT_ISSUER,
+            options={
+                "require": ["exp"],
+                "verify_aud": bool(AUTH_JWT_AUDIENCE),
+            },
+        )
+    except jwt.InvalidTokenError as e:
+        logger.warning(f"Local token verification failed: {e}")
+        return None
+    except jwt.PyJWTError as e:
+        # Ключ не подходит к алгоритму (например, секрет при RS256):
+        # ошибка настройки, а не токена
+        raise LocalVerificationUnavailable(f"Cannot verify token locally: {e}")
+
+    phone = claims.get(AUTH_JWT_PHONE_CLAIM)
+    if not phone:
+        raise LocalVerificationUnavailable(
+            f"Claim '{AUTH_JWT_PHONE_CLAIM}' not found in token"
+        )
+    return {"result": {"phone": phone}}
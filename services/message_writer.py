@@ -0,0 +1,154 @@
+import asyncio
+from typing import Optional
+from crud import Postgres
+from crud.hot_queries import insert_messages
+from utils.config import (
+    MESSAGE_BATCH_SIZE,
+    MESSAGE_FLUSH_INTERVAL,
+    MESSAGE_QUEUE_MAX,
+    MESSAGE_FLUSH_RETRIES,
+    MESSAGE_FLUSH_BACKOFF,
+)
+from utils.logging_config import get_logger
+
+
+logger = get_logger(name="message_writer")
+
+
+class MessageWriteBehind:
+    """
+    Отложенная пакетная запись сообщений чата.
+
+    Сообщения со всех соединений складываются в ограниченную очередь и
+    записываются одним многострочным INSERT каждые flush_interval секунд
+    или по накоплении batch_size строк. При заполнении очереди enqueue
+    ждёт освобождения места. stop() записывает всё, что осталось.
+
+    Запись идёт одним соединением в обход db_limiter: при перегрузке БД
+    сообщения не отбрасываются, а пакет повторяется с нарастающей
+    задержкой (до flush_retries раз), пока очередь держит нагрузку.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = MESSAGE_BATCH_SIZE,
+        flush_interval: float = MESSAGE_FLUSH_INTERVAL,
+        max_pending: int = MESSAGE_QUEUE_MAX,
+        flush_retries: int = MESSAGE_FLUSH_RETRIES,
+        flush_backoff: float = MESSAGE_FLUSH_BACKOFF,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.flush_retries = flush_retries
+        self.flush_backoff = flush_backoff
+        self.db: Optional[Postgres] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Future] = None
+        self._batch: list[dict] = []
+        self.enqueued = 0
+        self.flushed_rows = 0
+        self.flushes = 0
+        self.failed_rows = 0
+        self.retries = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, db: Postgres):
+        if self.running:
+            return
+        self.db = db
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, message_data: dict):
+        await self._queue.put(message_data)
+        self.enqueued += 1
+
+    async def _collect(self):
+        """
+        Набирает пакет: ждёт первую строку, затем добирает остальные
+        до batch_size, но не дольше flush_interval.
+        """
+        loop = asyncio.get_running_loop()
+        self._batch.append(await self._queue.get())
+        deadline = loop.time() + self.flush_interval
+        while len(self._batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                self._batch.append(
+                    await asyncio.wait_for(self._queue.get(), timeout)
+                )
+            except asyncio.TimeoutError:
+                break
+
+    async def _flush(self, batch: list[dict]):
+        written = 0
+        for attempt in range(self.flush_retries + 1):
+            try:
+                written = await insert_messages(self.db, batch, admit=False)
+                break
+            except Exception as e:
+                if attempt == self.flush_retries:
+                    logger.error(
+                        f"Error flushing {len(batch)} messages, "
+                        f"giving up after {attempt + 1} attempts: {e}"
+                    )
+                    break
+                delay = min(self.flush_backoff * 2**attempt, 5)
+                self.retries += 1
+                logger.warning(
+                    f"Error flushing {len(batch)} messages, "
+                    f"retry in {delay:.2f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+        if written:
+            self.flushes += 1
+            self.flushed_rows += written
+        else:
+            self.failed_rows += len(batch)
+
+    async def _run(self):
+        while True:
+            await self._collect()
+            batch, self._batch = self._batch, []
+            # shield: отмена цикла при остановке не прерывает запись пакета
+            self._flushing = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._flushing)
+
+    async def stop(self):
+        """
+        Останавливает фоновую запись и записывает оставшиеся сообщения.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        if self._flushing is not None:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+
+        leftovers, self._batch = self._batch, []
+        while not self._queue.empty():
+            leftovers.append(self._queue.get_nowait())
+        for i in range(0, len(leftovers), self.batch_size):
+            await self._flush(leftovers[i : i + self.batch_size])
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "enqueued": self.enqueued,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+            "retries": self.retries,
+        }
+
+
+message_writer = MessageWriteBehind()
@@ -5,6 +5,7 @@ from utils.config import ANTHROPIC_API_KEY
 import time
 from openai import AsyncOpenAI
 from utils.config import OPENAI_API_KEY
+from utils.admission_control import gpt_limiter
 from utils.logging_config import get_logger
 
 logger = get_logger(name="openai_service")
@@ -110,7 +111,13 @@ client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 async def send_to_gpt(dialogue_history, instruction):
     """
     Отправляет запрос в GPT с учетом накопленной истории диалога.
+    При переполнении очереди к GPT бросает OverloadedError.
     """
+    async with gpt_limiter.slot():
+        return await _send_to_gpt(dialogue_history, instruction)
+
+
+async def _send_to_gpt(dialogue_history, instruction):
     try:
         logger.info(f"dialogue_history: {dialogue_history}")
 
@@ -1,6 +1,8 @@
 import json
+from datetime import datetime, timezone
 from crud import Postgres
-from models import Message
+from crud.hot_queries import insert_messages
+from services.message_writer import message_writer
 
 
 async def save_message_to_db(
@@ -20,5 +22,11 @@ async def save_message_to_db(
         "is_created_by_user": is_created_by_user,
     }
 
-    # Добавляем запись в базу данных
-    await db.add_entity(message_data, Message)
+    # Добавляем запись в базу данных: пакетно через очередь, если она запущена
+    if message_writer.running:
+        # Время фиксируем сейчас, а не в момент записи пакета,
+        # чтобы сохранить порядок сообщений в истории
+        message_data["created_at"] = datetime.now(timezone.utc)
+        await message_writer.enqueue(message_data)
+    else:
+        await insert_messages(db, [message_data])
@@ -4,6 +4,7 @@ import json
 import aiofiles
 from crud import Postgres
 from models import Survey
+from utils.admission_control import OverloadedError
 from utils.logging_config import get_logger
 
 logger = get_logger(name="statistics_service")
@@ -54,6 +55,8 @@ async def generate_statistics_file(user_id, db: Postgres):
 
         excel_file_path = await save_json_to_excel(statistics_json)
         return statistics_json
+    except OverloadedError:
+        raise
     except Exception as e:
         logger.error(
             f"Error generating statistics file for user {user_id}: {e}"
@@ -0,0 +1,222 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Optional
+from services.audio_transcoder import FFMPEG_OPUS_COMMAND, TranscodeError
+from services.yandex_service import recognize_speech
+from utils.admission_control import stt_limiter
+from utils.config import (
+    AUDIO_TRANSCODE_TIMEOUT,
+    STT_STREAMING_BACKEND,
+    STT_LOCAL_TRANSCRIPT,
+)
+from utils.logging_config import get_logger
+from utils.stt_cache import stt_cache
+
+
+logger = get_logger(name="streaming_stt")
+
+# Размер чтения перекодированного потока из stdout ffmpeg
+READ_CHUNK_SIZE = 16 * 1024
+
+
+class StreamingSTTSession(ABC):
+    """
+    Сессия потокового распознавания одного клипа: OGG/Opus приходит
+    частями по мере перекодирования, текст возвращает finish().
+    """
+
+    @abstractmethod
+    async def send(self, chunk: bytes) -> None:
+        pass
+
+    @abstractmethod
+    async def finish(self) -> Optional[str]:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class StreamingSTTBackend(ABC):
+    @abstractmethod
+    async def open(self, lang: str) -> StreamingSTTSession:
+        pass
+
+
+class _SpeechKitSession(StreamingSTTSession):
+    """
+    Не потоковая: копит OGG/Opus и отправляет его одним запросом
+    recognize_speech в finish(). Потоковый API SpeechKit (gRPC v3)
+    в проекте не подключён.
+    """
+
+    def __init__(self, lang: str):
+        self.lang = lang
+        self.chunks: list[bytes] = []
+
+    async def send(self, chunk: bytes) -> None:
+        self.chunks.append(chunk)
+
+    async def finish(self) -> Optional[str]:
+        return await recognize_speech(b"".join(self.chunks), lang=self.lang)
+
+
+class SpeechKitBackend(StreamingSTTBackend):
+    """
+    Yandex SpeechKit. С загрузкой совмещается только перекодирование:
+    распознавание - один запрос сразу после последнего кадра.
+    """
+
+    async def open(self, lang: str) -> StreamingSTTSession:
+        return _SpeechKitSession(lang)
+
+
+class _LocalSession(StreamingSTTSession):
+    def __init__(self, transcript: Optional[str]):
+        self.transcript = transcript
+        self.received = 0
+        self.chunks = 0
+
+    async def send(self, chunk: bytes) -> None:
+        self.received += len(chunk)
+        self.chunks += 1
+
+    async def finish(self) -> Optional[str]:
+        if not self.received:
+            return None
+        if self.transcript is not None:
+            return self.transcript
+        return f"[local stt: {self.received} bytes in {self.chunks} chunks]"
+
+
+class LocalBackend(StreamingSTTBackend):
+    """
+    Локальная замена распознавания для работы без сети: считает
+    полученные данные и возвращает заданный текст.
+    """
+
+    def __init__(self, transcript: Optional[str] = STT_LOCAL_TRANSCRIPT):
+        self.transcript = transcript
+
+    async def open(self, lang: str) -> StreamingSTTSession:
+        return _LocalSession(self.transcript)
+
+
+class StreamingRecognition:
+    """
+    Распознавание клипа во время загрузки.
+
+    Кадры сразу передаются в stdin ffmpeg, перекодированный поток из
+    stdout уходит в сессию распознавания, открытую в start(). Насколько
+    распознавание идёт одновременно с загрузкой, зависит от бэкенда
+    (SpeechKitBackend распознаёт клип одним запросом в finish()).
+    """
+
+    def __init__(self, backend: StreamingSTTBackend, lang: str):
+        self.backend = backend
+        self.lang = lang
+        self._process = None
+        self._session: Optional[StreamingSTTSession] = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._session = await self.backend.open(self.lang)
+        self._process = await asyncio.create_subprocess_exec(
+            *FFMPEG_OPUS_COMMAND,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self._reader = asyncio.create_task(self._forward())
+
+    async def _forward(self):
+        while True:
+            chunk = await self._process.stdout.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            await self._session.send(chunk)
+
+    async def feed(self, chunk) -> None:
+        try:
+            self._process.stdin.write(chunk)
+            await self._process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise TranscodeError(f"ffmpeg stopped reading input: {e!r}")
+
+    async def finish(self, audio) -> Optional[str]:
+        """
+        Дожидается текста клипа. audio - загруженный клип целиком: если
+        он уже распознавался, текст берётся из кэша, а поток прерывается.
+        """
+        cache_key = stt_cache.key(audio, self.lang)
+        text = await stt_cache.get(cache_key)
+        if text is not None:
+            await self.abort()
+            return text
+        try:
+            self._process.stdin.close()
+            await asyncio.wait_for(
+                asyncio.gather(self._reader, self._process.wait()),
+                AUDIO_TRANSCODE_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            await self.abort()
+            raise TranscodeError("Streaming transcoding timed out")
+        except BaseException:
+            await self.abort()
+            raise
+        if self._process.returncode != 0:
+            await self.abort()
+            raise TranscodeError(
+                f"ffmpeg exited with code {self._process.returncode}"
+            )
+        try:
+            async with stt_limiter.slot():
+                text = await self._session.finish()
+        finally:
+            await self._session.close()
+            self._session = None
+        await stt_cache.set(cache_key, text)
+        return text
+
+    async def abort(self) -> None:
+        """
+        Останавливает перекодирование. Повторный вызов ничего не делает.
+        """
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._process is not None and self._process.returncode is None:
+            self._process.kill()
+            await self._process.wait()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def get_streaming_backend() -> Optional[StreamingSTTBackend]:
+    if STT_STREAMING_BACKEND == "speechkit":
+        return SpeechKitBackend()
+    if STT_STREAMING_BACKEND == "local":
+        return LocalBackend()
+    return None
+
+
+async def start_streaming_recognition(
+    lang: str,
+) -> Optional[StreamingRecognition]:
+    """
+    Начинает распознавание загружаемого клипа на языке lang (ru-RU,
+    kk-KK). None - потоковый режим выключен или не запустился; тогда
+    клип распознаётся целиком.
+    """
+    backend = get_streaming_backend()
+    if backend is None:
+        return None
+    recognition = StreamingRecognition(backend, lang)
+    try:
+        await recognition.start()
+    except Exception as e:
+        logger.error(f"Error starting streaming recognition: {e}")
+        await recognition.abort()
+        return None
+    return recognition
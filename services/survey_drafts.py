@@ -0,0 +1,269 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from crud import Postgres
+from models import Survey
+from utils.config import (
+    SURVEY_DRAFT_GRACE,
+    SURVEY_SWEEP_INTERVAL,
+)
+from utils.logging_config import get_logger
+from utils.redis_client import redis
+
+
+logger = get_logger(name="survey_drafts")
+
+# Незавершённые опросы: участник "user_id:survey_id", вес - срок записи
+SURVEY_DRAFTS_KEY = "survey_drafts"
+# Ответ на последний вопрос завершает опрос
+SURVEY_FINAL_FIELD = "pain_type"
+SURVEY_WINDOW = timedelta(hours=1)
+FLUSH_LOCK_TTL = 60
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+# Ответы записываются, только если черновик с этим survey_id ещё на месте:
+# иначе перенос мог переименовать ключ, и HSET создал бы его заново
+# без survey_id, created_at и срока жизни
+SAVE_FIELDS_SCRIPT = """
+if redis.call("hget", KEYS[1], "survey_id") ~= ARGV[1] then
+    return 0
+end
+if #ARGV > 1 then
+    redis.call("hset", KEYS[1], unpack(ARGV, 2))
+end
+return 1
+"""
+# Новый черновик создаётся, только если другой процесс не успел создать свой
+CREATE_DRAFT_SCRIPT = """
+if redis.call("exists", KEYS[1]) == 1 then
+    return 0
+end
+redis.call("hset", KEYS[1], unpack(ARGV, 4))
+redis.call("expireat", KEYS[1], ARGV[1])
+redis.call("zadd", KEYS[2], ARGV[2], ARGV[3])
+return 1
+"""
+
+
+def _draft_key(user_id: str) -> str:
+    return f"survey_draft:{user_id}"
+
+
+def _flushing_key(user_id: str) -> str:
+    return f"survey_draft_flushing:{user_id}"
+
+
+def _lock_key(user_id: str) -> str:
+    return f"survey_draft_lock:{user_id}"
+
+
+def _member(user_id: str, survey_id: int) -> str:
+    return f"{user_id}:{survey_id}"
+
+
+def get_survey_deadline(created_at: datetime) -> datetime:
+    """
+    Опрос остаётся текущим час с момента создания, но не дольше конца дня
+    (так же, как в update_survey_data).
+    """
+    next_day = created_at.replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) + timedelta(days=1)
+    return min(created_at + SURVEY_WINDOW, next_day)
+
+
+def _decode(draft: dict) -> dict:
+    return {
+        key.decode() if isinstance(key, bytes) else key: (
+            value.decode() if isinstance(value, bytes) else value
+        )
+        for key, value in draft.items()
+    }
+
+
+async def allocate_survey_id(db: Postgres) -> int:
+    async with db.session() as session:
+        result = await session.execute(
+            select(
+                func.nextval(
+                    func.pg_get_serial_sequence("survey", "survey_id")
+                )
+            )
+        )
+        return result.scalar()
+
+
+async def write_survey_draft(
+    db: Postgres,
+    survey_id: int,
+    user_id: str,
+    created_at: datetime,
+    fields: dict,
+):
+    """
+    Записывает опрос в Postgres. Повторная запись того же survey_id
+    только обновляет поля, поэтому перенос можно безопасно повторять.
+    """
+    stmt = insert(Survey).values(
+        survey_id=survey_id,
+        userid=user_id,
+        created_at=created_at,
+        **fields,
+    )
+    if fields:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Survey.survey_id, Survey.userid],
+            set_={**fields, "updated_at": func.now()},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(
+            index_elements=[Survey.survey_id, Survey.userid]
+        )
+
+    async with db.session() as session:
+        await session.execute(stmt)
+        await db.commit(session)
+
+
+async def _flush_renamed(db: Postgres, user_id: str) -> Optional[int]:
+    """
+    Переносит в Postgres черновик, уже снятый с ответов (переименованный).
+    """
+    draft = _decode(await redis.hgetall(_flushing_key(user_id)))
+    if not draft:
+        return None
+
+    survey_id = int(draft.pop("survey_id"))
+    created_at = datetime.fromisoformat(draft.pop("created_at"))
+    await write_survey_draft(db, survey_id, user_id, created_at, draft)
+    await redis.delete(_flushing_key(user_id))
+    await redis.zrem(SURVEY_DRAFTS_KEY, _member(user_id, survey_id))
+    logger.info(f"Flushed survey draft {survey_id} for user {user_id}")
+    return survey_id
+
+
+async def flush_survey_draft(
+    db: Postgres,
+    user_id: str,
+    survey_id: Optional[int] = None,
+    wait: bool = False,
+) -> Optional[int]:
+    """
+    Переносит черновик опроса пользователя в Postgres и удаляет его из Redis.
+    Если указан survey_id, переносится только этот черновик.
+    """
+    lock = _lock_key(user_id)
+    token = uuid.uuid4().hex
+    while not await redis.set(lock, token, nx=True, ex=FLUSH_LOCK_TTL):
+        # Черновик уже переносит другой процесс
+        if not wait:
+            return None
+        await asyncio.sleep(0.05)
+
+    try:
+        # Черновик, не дописанный до сбоя
+        await _flush_renamed(db, user_id)
+
+        current = await redis.hget(_draft_key(user_id), "survey_id")
+        if current is None or (
+            survey_id is not None and int(current) != survey_id
+        ):
+            if survey_id is not None:
+                await redis.zrem(
+                    SURVEY_DRAFTS_KEY, _member(user_id, survey_id)
+                )
+            return None
+
+        # Новые ответы после переименования пойдут в новый черновик
+        await redis.rename(_draft_key(user_id), _flushing_key(user_id))
+        return await _flush_renamed(db, user_id)
+    finally:
+        # Снимаем только свою блокировку: после истечения TTL её мог
+        # взять другой процесс
+        await redis.eval(RELEASE_LOCK_SCRIPT, 1, lock, token)
+
+
+async def save_survey_draft_fields(
+    db: Postgres, user_id: str, fields: dict
+) -> int:
+    """
+    Сохраняет ответы в черновик опроса в Redis. Postgres используется
+    только при создании черновика (номер опроса) и при его завершении.
+    """
+    key = _draft_key(user_id)
+    now = datetime.now(timezone.utc)
+    values = [
+        item for name, value in fields.items() for item in (name, str(value))
+    ]
+
+    while True:
+        survey_id, created_at = await redis.hmget(
+            key, "survey_id", "created_at"
+        )
+        if survey_id is not None and now < get_survey_deadline(
+            datetime.fromisoformat(created_at.decode())
+        ):
+            if await redis.eval(
+                SAVE_FIELDS_SCRIPT, 1, key, survey_id, *values
+            ):
+                survey_id = int(survey_id)
+                break
+            # Черновик перенесли между проверкой и записью
+            continue
+
+        if survey_id is not None:
+            await flush_survey_draft(db, user_id, wait=True)
+
+        survey_id = await allocate_survey_id(db)
+        deadline = get_survey_deadline(now)
+        # Ключ живёт дольше срока, чтобы успеть перенести его в Postgres
+        expire_at = deadline + timedelta(seconds=SURVEY_DRAFT_GRACE)
+        created = await redis.eval(
+            CREATE_DRAFT_SCRIPT,
+            2,
+            key,
+            SURVEY_DRAFTS_KEY,
+            int(expire_at.timestamp()),
+            deadline.timestamp(),
+            _member(user_id, survey_id),
+            "survey_id",
+            survey_id,
+            "created_at",
+            now.isoformat(),
+            *values,
+        )
+        if created:
+            logger.info(f"Started survey draft {survey_id} for user {user_id}")
+            break
+        # Черновик одновременно создал другой процесс - пишем в него
+
+    if SURVEY_FINAL_FIELD in fields:
+        await flush_survey_draft(db, user_id, survey_id, wait=True)
+    return survey_id
+
+
+async def sweep_survey_drafts(db: Postgres):
+    """
+    Переносит в Postgres черновики, срок которых истёк. Работает в каждом
+    процессе; одновременный перенос одного черновика исключён блокировкой.
+    """
+    while True:
+        try:
+            due = await redis.zrangebyscore(
+                SURVEY_DRAFTS_KEY,
+                "-inf",
+                datetime.now(timezone.utc).timestamp(),
+            )
+            for member in due:
+                user_id, survey_id = member.decode().rsplit(":", 1)
+                await flush_survey_draft(db, user_id, int(survey_id))
+        except Exception as e:
+            logger.error(f"Error sweeping survey drafts: {e}")
+        await asyncio.sleep(SURVEY_SWEEP_INTERVAL)
@@ -1,13 +1,136 @@
 import json
+from typing import Optional
 from crud import Postgres
 from models import Survey
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import and_, select
+from sqlalchemy import and_, select, update, insert, func, literal, exists
+from services.survey_drafts import save_survey_draft_fields
+from services.survey_writer import SurveyWriteActors
+from utils.config import SURVEY_WRITE_MODE
 from utils.logging_config import get_logger
 
 
 logger = get_logger(name="survey_service")
 
+# Поле таблицы survey для каждого вопроса ежедневного опроса
+SURVEY_INDEX_FIELDS = {
+    1: "headache_today",
+    2: "medicament_today",
+    3: "pain_intensity",
+    4: "pain_area",
+    5: "area_detail",
+    6: "pain_type",
+}
+# Столбцы для поиска текущего опроса
+SURVEY_LOOKUP_COLUMNS = ("survey_id", "created_at")
+# Поля опроса, которые можно заполнять из ответов пользователя
+SURVEY_DATA_FIELDS = [
+    column.name
+    for column in Survey.__table__.columns
+    if column.name not in ("survey_id", "userid", "created_at", "updated_at")
+]
+
+
+def survey_fields_from_message(message: dict) -> dict:
+    """
+    Поля опроса из ответа на вопрос с индексом ({"index": 3, "text": ...}).
+    """
+    field = SURVEY_INDEX_FIELDS.get(message.get("index"))
+    if not field or not message.get("text"):
+        return {}
+    # pain_intensity может прийти числом
+    return {field: str(message["text"])}
+
+
+def survey_fields_from_dict(message: dict) -> dict:
+    """
+    Поля опроса из результатов голосового чата ({"pain_type": ..., ...}).
+    """
+    return {
+        key: value
+        for key, value in message.items()
+        if key in SURVEY_DATA_FIELDS and value
+    }
+
+
+def get_survey_window_start(current_time: datetime) -> datetime:
+    """
+    Опрос считается текущим, если создан сегодня и не более часа назад.
+    """
+    today_start = current_time.replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    return max(today_start, current_time - timedelta(hours=1))
+
+
+def build_survey_upsert(user_id: str, fields: dict, since: datetime):
+    """
+    Один запрос, который обновляет поля текущего опроса пользователя,
+    а если его нет - создаёт новый. Возвращает survey_id.
+    """
+    columns = Survey.__table__.c
+    current_survey_id = (
+        select(Survey.survey_id)
+        .where(Survey.userid == user_id, Survey.created_at >= since)
+        .order_by(Survey.created_at.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    updated = (
+        update(Survey)
+        .where(Survey.userid == user_id, Survey.survey_id == current_survey_id)
+        .values(**fields, updated_at=func.now())
+        .returning(Survey.survey_id)
+        .cte("updated")
+    )
+    inserted = (
+        insert(Survey)
+        .from_select(
+            ["userid", *fields],
+            select(
+                literal(user_id, columns.userid.type),
+                *[
+                    literal(value, columns[key].type)
+                    for key, value in fields.items()
+                ],
+            ).where(~exists(select(updated.c.survey_id))),
+        )
+        .returning(Survey.survey_id)
+        .cte("inserted")
+    )
+    return select(updated.c.survey_id).union_all(select(inserted.c.survey_id))
+
+
+async def apply_survey_fields(
+    db: Postgres, user_id: str, fields: dict
+) -> Optional[int]:
+    """
+    Записывает поля в текущий опрос пользователя за один запрос к БД.
+    """
+    if not fields:
+        return None
+
+    since = get_survey_window_start(datetime.now(timezone.utc))
+    async with db.session() as session:
+        result = await session.execute(
+            build_survey_upsert(user_id, fields, since)
+        )
+        survey_id = result.scalar()
+        await db.commit(session)
+
+    logger.info(
+        f"Saved survey {survey_id} fields {list(fields)} for user {user_id}"
+    )
+    return survey_id
+
+
+# Записи опроса каждого пользователя выполняются по очереди и объединяются
+survey_writer = SurveyWriteActors(
+    save_survey_draft_fields
+    if SURVEY_WRITE_MODE == "redis"
+    else apply_survey_fields
+)
+
 
 async def update_survey_data(db: Postgres, user_id: str, message: dict):
     """
@@ -16,6 +139,69 @@ async def update_survey_data(db: Postgres, user_id: str, message: dict):
     """
     logger.info(f"message_for_updating_survey: {message}")
 
+    if SURVEY_WRITE_MODE == "legacy":
+        # SELECT и UPDATE прежнего способа - в одной транзакции
+        async with db.unit_of_work():
+            return await update_survey_data_legacy(db, user_id, message)
+
+    try:
+        await survey_writer.submit(
+            db, user_id, survey_fields_from_message(message)
+        )
+    except Exception as e:
+        logger.error(f"Error updating survey data: {e}")
+
+
+async def update_survey_data_many(db: Postgres, user_id: str, messages: list):
+    """
+    Обновляет опрос ответами на несколько вопросов сразу (all_in_one_message):
+    поля всех ответов объединяются в одну запись.
+    """
+    logger.info(f"messages_for_updating_survey: {messages}")
+
+    if SURVEY_WRITE_MODE == "legacy":
+        async with db.unit_of_work():
+            for message in messages:
+                await update_survey_data_legacy(db, user_id, message)
+        return
+
+    fields = {}
+    for message in messages:
+        fields.update(survey_fields_from_message(message))
+    try:
+        await survey_writer.submit(db, user_id, fields)
+    except Exception as e:
+        logger.error(f"Error updating survey data: {e}")
+
+
+async def update_survey_data_live_barsik(
+    db: Postgres, user_id: str, message: dict
+):
+    """
+    Обновляет информацию по ежедневному опросу на основании полученных данных.
+    Если запись по опросу еще не существует или была создана более 1 часа назад, создается новая.
+    """
+    logger.info(f"message_for_updating_survey: {message}")
+
+    if SURVEY_WRITE_MODE == "legacy":
+        async with db.unit_of_work():
+            return await update_survey_data_live_barsik_legacy(
+                db, user_id, message
+            )
+
+    try:
+        await survey_writer.submit(
+            db, user_id, survey_fields_from_dict(message)
+        )
+    except Exception as e:
+        logger.error(f"Error updating survey data: {e}")
+
+
+async def update_survey_data_legacy(db: Postgres, user_id: str, message: dict):
+    """
+    Прежний способ записи (SELECT + UPDATE по каждому полю).
+    Оставлен для сравнения, включается SURVEY_WRITE_MODE=legacy.
+    """
     try:
         # Преобразуем content в JSON-строку, если это dict
         if isinstance(message, dict):
@@ -37,19 +223,17 @@ async def update_survey_data(db: Postgres, user_id: str, message: dict):
         logger.info(f"Time 1 hour ago: {one_hour_ago}")
 
         # Поиск записи с userid и фильтрация по дате создания
-        async with db.async_session() as session:
-            # Создаем запрос для поиска записи по user_id и времени создания
-            query = select(Survey).where(
-                and_(
-                    Survey.userid == user_id,
-                    Survey.created_at
-                    >= today_start,  # Фильтр по сегодняшнему дню
-                    Survey.created_at
-                    >= one_hour_ago,  # Фильтр по времени создания записи менее 1 часа назад
-                )
-            )
-            result = await session.execute(query)
-            survey = result.scalars().first()
+        # Нужны только номер опроса и время создания
+        survey = await db.get_entity_parameter(
+            Survey,
+            parameter=SURVEY_LOOKUP_COLUMNS,
+            custom_filter=and_(
+                Survey.userid == user_id,
+                Survey.created_at >= today_start,  # Фильтр по сегодняшнему дню
+                Survey.created_at
+                >= one_hour_ago,  # Фильтр по времени создания записи менее 1 часа назад
+            ),
+        )
 
         # Если запись существует и была создана менее 1 часа назад, обновляем её
         if survey and survey.created_at >= one_hour_ago:
@@ -145,15 +329,13 @@ async def update_survey_data(db: Postgres, user_id: str, message: dict):
         logger.error(f"Error updating survey data: {e}")
 
 
-async def update_survey_data_live_barsik(
+async def update_survey_data_live_barsik_legacy(
     db: Postgres, user_id: str, message: dict
 ):
     """
-    Обновляет информацию по ежедневному опросу на основании полученных данных.
-    Если запись по опросу еще не существует или была создана более 1 часа назад, создается новая.
+    Прежний способ записи результатов голосового чата.
+    Оставлен для сравнения, включается SURVEY_WRITE_MODE=legacy.
     """
-    logger.info(f"message_for_updating_survey: {message}")
-
     try:
         # Преобразуем content в JSON-строку, если это dict
         if isinstance(message, dict):
@@ -175,15 +357,14 @@ async def update_survey_data_live_barsik(
         logger.info(f"Time 1 hour ago: {one_hour_ago}")
 
         # Поиск записи с userid и фильтрация по дате создания
-        async with db.async_session() as session:
-            query = select(Survey).where(
-                and_(
-                    Survey.userid == user_id,
-                    Survey.created_at >= today_start,  # Запись за сегодня
-                )
-            )
-            result = await session.execute(query)
-            survey = result.scalars().first()
+        survey = await db.get_entity_parameter(
+            Survey,
+            parameter=SURVEY_LOOKUP_COLUMNS,
+            custom_filter=and_(
+                Survey.userid == user_id,
+                Survey.created_at >= today_start,  # Запись за сегодня
+            ),
+        )
 
         # Если запись существует и была создана менее 1 часа назад, обновляем её
         if survey and survey.created_at >= one_hour_ago:
@@ -192,8 +373,10 @@ async def update_survey_data_live_barsik(
 
             # Проходим по всем ключам в `message` и обновляем только переданные поля
             for key, value in message.items():
+                # survey - строка (survey_id, created_at), поля проверяем
+                # по модели
                 if (
-                    hasattr(survey, key) and value
+                    hasattr(Survey, key) and value
                 ):  # Проверяем, есть ли такое поле в модели
                     await db.update_entity_parameter(
                         (survey.survey_id, user_id),
@@ -0,0 +1,124 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+from crud import Postgres
+from utils.config import SURVEY_ACTOR_IDLE_TIMEOUT
+from utils.logging_config import get_logger
+from utils.unit_of_work import detach_unit_of_work
+
+
+logger = get_logger(name="survey_writer")
+
+
+class _SurveyActor:
+    """
+    Очередь записей опроса одного пользователя.
+    """
+
+    def __init__(self):
+        self.pending: dict = {}
+        self.waiters: list[asyncio.Future] = []
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+class SurveyWriteActors:
+    """
+    Последовательная запись опроса по каждому пользователю.
+
+    Все изменения опроса пользователя выполняет один актор, поэтому
+    параллельные обновления не создают несколько записей опроса.
+    Поля, пришедшие пока идёт запись, объединяются и записываются
+    следующим одним запросом. Актор без работы дольше idle_timeout
+    удаляется, так что память зависит только от числа активных
+    пользователей.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[Postgres, str, dict], Awaitable[Optional[int]]],
+        idle_timeout: float = SURVEY_ACTOR_IDLE_TIMEOUT,
+    ):
+        self._write = write
+        self.idle_timeout = idle_timeout
+        self._actors: dict[str, _SurveyActor] = {}
+        self.submitted = 0
+        self.writes = 0
+        self.failed_writes = 0
+        self.evicted = 0
+
+    async def submit(
+        self, db: Postgres, user_id: str, fields: dict
+    ) -> Optional[int]:
+        """
+        Ставит поля в очередь пользователя и ждёт их записи.
+        Возвращает survey_id.
+        """
+        if not fields:
+            return None
+
+        actor = self._actors.get(user_id)
+        if actor is None:
+            actor = self._actors[user_id] = _SurveyActor()
+        if actor.task is None or actor.task.done():
+            actor.task = asyncio.create_task(
+                self._run(db, user_id, actor), name=f"survey:{user_id}"
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        actor.pending.update(fields)
+        actor.waiters.append(waiter)
+        actor.wakeup.set()
+        self.submitted += 1
+        # shield: отмена вызывающего не отменяет уже начатую запись
+        return await asyncio.shield(waiter)
+
+    async def _run(self, db: Postgres, user_id: str, actor: _SurveyActor):
+        # Актор обслуживает многие запросы, а не только создавший его
+        detach_unit_of_work()
+        try:
+            while True:
+                if not actor.pending:
+                    actor.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(
+                            actor.wakeup.wait(), self.idle_timeout
+                        )
+                    except asyncio.TimeoutError:
+                        if not actor.pending:
+                            break
+                        continue
+
+                fields, actor.pending = actor.pending, {}
+                waiters, actor.waiters = actor.waiters, []
+                try:
+                    survey_id = await self._write(db, user_id, fields)
+                    self.writes += 1
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(survey_id)
+                except Exception as e:
+                    self.failed_writes += 1
+                    logger.error(
+                        f"Error writing survey fields {list(fields)} "
+                        f"for user {user_id}: {e}"
+                    )
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(e)
+        finally:
+            if self._actors.get(user_id) is actor:
+                del self._actors[user_id]
+                self.evicted += 1
+            for waiter in actor.waiters:
+                if not waiter.done():
+                    waiter.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "active_users": len(self._actors),
+            "submitted": self.submitted,
+            "writes": self.writes,
+            "coalesced": self.submitted - self.writes - self.failed_writes,
+            "failed_writes": self.failed_writes,
+            "evicted": self.evicted,
+        }
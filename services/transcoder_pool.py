@@ -0,0 +1,334 @@
+import asyncio
+import io
+import multiprocessing
+import signal
+import subprocess
+import time
+from typing import Optional, Union
+from services.audio_transcoder import FFMPEG_OPUS_COMMAND, TranscodeError
+from utils.config import (
+    AUDIO_TRANSCODE_TIMEOUT,
+    TRANSCODER_POOL_SIZE,
+    TRANSCODER_QUEUE_SIZE,
+    TRANSCODER_HEALTH_INTERVAL,
+    TRANSCODER_QUEUE_TIMEOUT,
+)
+from utils.logging_config import get_logger
+
+try:
+    import av
+except ImportError:
+    av = None
+
+
+logger = get_logger(name="transcoder_pool")
+
+PING = "ping"
+
+
+def transcode_in_process(audio: bytes) -> bytes:
+    """
+    Перекодирует аудио в OGG/Opus 16 кГц моно в текущем процессе.
+    С PyAV кодеки работают прямо в процессе, без запуска ffmpeg; вход
+    читается из памяти с перемоткой, поэтому подходит и m4a.
+    """
+    if av is None:
+        result = subprocess.run(
+            FFMPEG_OPUS_COMMAND, input=audio, capture_output=True
+        )
+        if result.returncode != 0 or not result.stdout:
+            raise TranscodeError(
+                result.stderr.decode(errors="replace").strip()[-500:]
+            )
+        return result.stdout
+
+    output = io.BytesIO()
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=16000)
+    with av.open(io.BytesIO(audio)) as source, av.open(
+        output, "w", format="ogg"
+    ) as target:
+        stream = target.add_stream("libopus", rate=16000, layout="mono")
+        for frame in source.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                target.mux(stream.encode(resampled))
+        for resampled in resampler.resample(None):
+            target.mux(stream.encode(resampled))
+        target.mux(stream.encode(None))
+    return output.getvalue()
+
+
+def _worker_loop(conn):
+    """
+    Процесс-воркер: принимает аудио по каналу и возвращает
+    ("ok", opus) или ("error", текст ошибки).
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request == PING:
+            conn.send(PING)
+            continue
+        try:
+            conn.send(("ok", transcode_in_process(request)))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class PoolUnavailableError(TranscodeError):
+    """
+    Процессы пула не удалось запустить (например, из демонического
+    процесса). Перекодирование нужно выполнить другим способом.
+    """
+
+
+class _Worker:
+    """
+    Один процесс-воркер и его счётчики.
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.jobs = 0
+        self.failures = 0
+        self.restarts = 0
+        self.busy = False
+        self.healthy = False
+        self.last_health_check: Optional[float] = None
+
+    def call(self, request):
+        # Выполняется в потоке: recv блокирует до ответа воркера
+        self.conn.send(request)
+        return self.conn.recv()
+
+
+class TranscoderPool:
+    """
+    Пул долгоживущих процессов перекодирования аудио.
+
+    Задания ставятся в общую очередь, каждый воркер забирает следующее,
+    как только освободится, поэтому перекодирование идёт на всех ядрах
+    без запуска процесса на каждое сообщение. Воркер, который завис,
+    упал или не ответил на проверку, перезапускается.
+    """
+
+    def __init__(
+        self,
+        size: int = TRANSCODER_POOL_SIZE,
+        max_queue: int = TRANSCODER_QUEUE_SIZE,
+        timeout: float = AUDIO_TRANSCODE_TIMEOUT,
+        health_interval: float = TRANSCODER_HEALTH_INTERVAL,
+        queue_timeout: float = TRANSCODER_QUEUE_TIMEOUT,
+    ):
+        self.size = size
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.queue_timeout = queue_timeout
+        self._start_lock = asyncio.Lock()
+        self.unavailable: Optional[str] = None
+        self._ctx = multiprocessing.get_context("spawn")
+        self._workers: list[_Worker] = []
+        self._tasks: list[asyncio.Task] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    async def start(self):
+        """
+        Запускает процессы пула. Если это невозможно, пул помечается
+        недоступным и бросается PoolUnavailableError.
+        """
+        if self.unavailable:
+            raise PoolUnavailableError(self.unavailable)
+        async with self._start_lock:
+            if self._queue is not None:
+                return
+            workers = []
+            try:
+                for index in range(self.size):
+                    worker = _Worker(index)
+                    workers.append(worker)
+                    await asyncio.to_thread(self._spawn, worker)
+            except Exception as e:
+                for worker in workers:
+                    await asyncio.to_thread(self._terminate, worker)
+                self.unavailable = f"Transcoder pool cannot start: {e!r}"
+                logger.error(self.unavailable)
+                raise PoolUnavailableError(self.unavailable)
+
+            self._workers = workers
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._tasks = [
+                asyncio.create_task(
+                    self._serve(worker), name=f"transcoder:{worker.index}"
+                )
+                for worker in workers
+            ]
+            logger.info(f"Transcoder pool started with {self.size} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for worker in self._workers:
+            await asyncio.to_thread(self._terminate, worker)
+        self._workers, self._tasks, self._queue = [], [], None
+
+    async def transcode(
+        self, audio: Union[bytes, bytearray, memoryview]
+    ) -> bytes:
+        """
+        Перекодирует аудио в OGG/Opus на свободном воркере. Если очередь
+        заполнена, ждёт места в ней. Ожидание в очереди и перекодирование
+        вместе ограничены queue_timeout + timeout.
+        """
+        await self.start()
+        self.submitted += 1
+        try:
+            return await asyncio.wait_for(
+                self._submit(bytes(audio)), self.queue_timeout + self.timeout
+            )
+        except asyncio.TimeoutError:
+            self.failed += 1
+            raise TranscodeError("Transcoder pool did not answer in time")
+
+    async def _submit(self, audio: bytes) -> bytes:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((audio, future, time.monotonic()))
+        # При отмене по тайм-ауту воркер пропустит отменённое задание
+        return await future
+
+    def _spawn(self, worker: _Worker):
+        parent_conn, child_conn = self._ctx.Pipe()
+        worker.process = self._ctx.Process(
+            target=_worker_loop,
+            args=(child_conn,),
+            name=f"transcoder-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        child_conn.close()
+        worker.conn = parent_conn
+        worker.healthy = True
+
+    def _terminate(self, worker: _Worker):
+        if worker.process is not None and worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join(1)
+        if worker.conn is not None:
+            worker.conn.close()
+
+    async def _restart(self, worker: _Worker, reason: str):
+        logger.warning(
+            f"Restarting transcoder worker {worker.index}: {reason}"
+        )
+        worker.restarts += 1
+        # join и запуск процесса блокируют, поэтому выполняются в потоке
+        await asyncio.to_thread(self._terminate, worker)
+        await asyncio.to_thread(self._spawn, worker)
+
+    async def _call(self, worker: _Worker, request, timeout: float):
+        worker.busy = True
+        try:
+            return await asyncio.wait_for(
+                asyncio.to_thread(worker.call, request), timeout
+            )
+        except (asyncio.TimeoutError, EOFError, OSError) as e:
+            worker.healthy = False
+            await self._restart(worker, repr(e))
+            raise TranscodeError(f"Transcoder worker failed: {e!r}")
+        finally:
+            worker.busy = False
+
+    async def _check_health(self, worker: _Worker):
+        worker.last_health_check = time.time()
+        if not worker.process.is_alive():
+            worker.healthy = False
+            await self._restart(worker, "process exited")
+            return
+        try:
+            await self._call(worker, PING, 5)
+            worker.healthy = True
+        except TranscodeError:
+            pass
+
+    async def _serve(self, worker: _Worker):
+        while True:
+            try:
+                audio, future, enqueued_at = await asyncio.wait_for(
+                    self._queue.get(), self.health_interval
+                )
+            except asyncio.TimeoutError:
+                # Без заданий - проверяем, что воркер жив и отвечает
+                await self._check_health(worker)
+                continue
+
+            wait_time = time.monotonic() - enqueued_at
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+            try:
+                if future.cancelled():
+                    continue
+                if not worker.process.is_alive():
+                    await self._restart(worker, "process exited")
+                try:
+                    status, result = await self._call(
+                        worker, audio, self.timeout
+                    )
+                    if status != "ok":
+                        raise TranscodeError(result)
+                    worker.jobs += 1
+                    self.completed += 1
+                    if not future.done():
+                        future.set_result(result)
+                except TranscodeError as e:
+                    worker.failures += 1
+                    self.failed += 1
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        processed = self.completed + self.failed
+        return {
+            "size": self.size,
+            "unavailable": self.unavailable,
+            "backend": "pyav" if av is not None else "ffmpeg",
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_max": self.max_queue,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(
+                self.total_wait_time / processed * 1000 if processed else 0, 2
+            ),
+            "max_wait_ms": round(self.max_wait_time * 1000, 2),
+            "workers": [
+                {
+                    "worker": worker.index,
+                    "pid": worker.process.pid if worker.process else None,
+                    "alive": bool(
+                        worker.process and worker.process.is_alive()
+                    ),
+                    "healthy": worker.healthy,
+                    "busy": worker.busy,
+                    "jobs": worker.jobs,
+                    "failures": worker.failures,
+                    "restarts": worker.restarts,
+                    "last_health_check": worker.last_health_check,
+                }
+                for worker in self._workers
+            ],
+        }
+
+
+transcoder_pool = TranscoderPool()
@@ -0,0 +1,58 @@
+from typing import Optional
+from crud import Postgres
+from crud.hot_queries import fetch_user_profile
+from models import User
+from utils.logging_config import get_logger
+from utils.user_profile_cache import user_profiles
+
+
+logger = get_logger(name="user_profile_service")
+
+PROFILE_FIELDS = ("language", "role", "reminder_time")
+
+
+def _to_profile(row) -> dict:
+    return {
+        "language": row.language,
+        "role": row.role,
+        "reminder_time": (
+            row.reminder_time.strftime("%H:%M") if row.reminder_time else None
+        ),
+    }
+
+
+async def get_user_profile(db: Postgres, user_id: str) -> Optional[dict]:
+    """
+    Возвращает профиль пользователя из кэша, при промахе - из БД.
+    None, если пользователя нет.
+    """
+    user_id = str(user_id)
+    profile = await user_profiles.get(user_id)
+    if profile is not None:
+        return profile
+
+    row = await fetch_user_profile(db, user_id)
+    if row is None:
+        return None
+
+    profile = _to_profile(row)
+    await user_profiles.set(user_id, profile)
+    return profile
+
+
+async def ensure_user_exists(db: Postgres, user_id: str) -> None:
+    """
+    Создаёт пользователя, если его ещё нет. Для известных пользователей
+    обращения к БД не происходит.
+    """
+    user_id = str(user_id)
+    async with db.unit_of_work():
+        if await get_user_profile(db, user_id) is not None:
+            return
+
+        # Одновременное создание тем же запросом из другого места безопасно
+        created = await db.add_entity_if_not_exists({"userid": user_id}, User)
+
+    if created:
+        logger.info(f"Created user {user_id}")
+        await user_profiles.set(user_id, dict.fromkeys(PROFILE_FIELDS))
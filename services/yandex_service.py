@@ -1,31 +1,179 @@
 import asyncio
-import ffmpeg
+import os
+import random
+import time
 import tempfile
+from typing import Optional
 import httpx
-import requests
 from utils.logging_config import get_logger
-from utils.config import YANDEX_OAUTH_TOKEN, YANDEX_FOLDER_ID
+from utils.config import (
+    YANDEX_OAUTH_TOKEN,
+    YANDEX_FOLDER_ID,
+    YANDEX_HTTP2,
+    YANDEX_MAX_CONNECTIONS,
+    YANDEX_STT_TIMEOUT,
+    YANDEX_TTS_TIMEOUT,
+    YANDEX_TRANSLATE_TIMEOUT,
+    YANDEX_MAX_RETRIES,
+    YANDEX_RETRY_BACKOFF,
+)
 import subprocess
-import io
 
 YANDEX_IAM_TOKEN = None
 
 logger = get_logger(name="yandex_service")
 
+# Ответы, после которых запрос стоит повторить
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Общий клиент: keep-alive соединения (HTTP/2) с API Яндекса переиспользуются
+_http_client: Optional[httpx.AsyncClient] = None
+_iam_lock = asyncio.Lock()
+_stats = {
+    operation: {
+        "calls": 0,
+        "failures": 0,
+        "retries": 0,
+        "total_latency": 0.0,
+        "max_latency": 0.0,
+    }
+    for operation in ("iam", "stt", "tts", "translate")
+}
+
+
+def get_yandex_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=YANDEX_HTTP2,
+            timeout=10,
+            limits=httpx.Limits(
+                max_connections=YANDEX_MAX_CONNECTIONS,
+                max_keepalive_connections=YANDEX_MAX_CONNECTIONS,
+            ),
+        )
+    return _http_client
+
+
+async def close_yandex_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def get_yandex_stats() -> dict:
+    return {
+        operation: {
+            "calls": stats["calls"],
+            "failures": stats["failures"],
+            "retries": stats["retries"],
+            "avg_latency_ms": round(
+                (
+                    stats["total_latency"] / stats["calls"] * 1000
+                    if stats["calls"]
+                    else 0
+                ),
+                2,
+            ),
+            "max_latency_ms": round(stats["max_latency"] * 1000, 2),
+        }
+        for operation, stats in _stats.items()
+    }
+
+
+async def _request(
+    operation: str,
+    url: str,
+    timeout: float,
+    authorized: bool = True,
+    headers: Optional[dict] = None,
+    **kwargs,
+) -> httpx.Response:
+    """
+    POST к API Яндекса через общий клиент. Сетевые ошибки, 429 и 5xx
+    повторяются до YANDEX_MAX_RETRIES раз с экспоненциальной задержкой
+    и случайным разбросом. При 401 IAM-токен обновляется один раз.
+    """
+    stats = _stats[operation]
+    stats["calls"] += 1
+    started = time.perf_counter()
+    response = None
+    attempt = 0
+    token_refreshed = False
+    try:
+        while True:
+            request_headers = dict(headers or {})
+            if authorized:
+                if not YANDEX_IAM_TOKEN:
+                    await _refresh_iam_token(None)
+                request_headers["Authorization"] = f"Bearer {YANDEX_IAM_TOKEN}"
+            try:
+                response = await get_yandex_client().post(
+                    url, headers=request_headers, timeout=timeout, **kwargs
+                )
+                error = f"status code {response.status_code}"
+            except httpx.TransportError as e:
+                if attempt >= YANDEX_MAX_RETRIES:
+                    raise
+                response, error = None, repr(e)
+
+            if response is not None:
+                if (
+                    response.status_code == 401
+                    and authorized
+                    and not token_refreshed
+                ):
+                    token_refreshed = True
+                    await _refresh_iam_token(YANDEX_IAM_TOKEN)
+                    continue
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt >= YANDEX_MAX_RETRIES
+                ):
+                    return response
+
+            attempt += 1
+            stats["retries"] += 1
+            # Полный разброс: одновременные повторы не идут одной волной
+            delay = random.uniform(0, YANDEX_RETRY_BACKOFF * 2**attempt)
+            logger.warning(
+                f"Yandex {operation} request failed ({error}), "
+                f"retry {attempt} in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+    finally:
+        latency = time.perf_counter() - started
+        stats["total_latency"] += latency
+        stats["max_latency"] = max(stats["max_latency"], latency)
+        if response is None or response.status_code >= 400:
+            stats["failures"] += 1
+
 
 async def get_iam_token():
     global YANDEX_IAM_TOKEN
     url = "https://iam.api.cloud.yandex.net/iam/v1/tokens"
     payload = {"yandexPassportOauthToken": YANDEX_OAUTH_TOKEN}
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            YANDEX_IAM_TOKEN = response.json()["iamToken"]
-            logger.info(f"Received new IAM token: {YANDEX_IAM_TOKEN}")
-        except Exception as e:
-            logger.error(f"Error getting IAM token: {e}")
+    try:
+        response = await _request(
+            "iam", url, timeout=10, authorized=False, json=payload
+        )
+        response.raise_for_status()
+        YANDEX_IAM_TOKEN = response.json()["iamToken"]
+        logger.info(f"Received new IAM token: {YANDEX_IAM_TOKEN}")
+    except Exception as e:
+        logger.error(f"Error getting IAM token: {e}")
+
+
+async def _refresh_iam_token(stale_token: Optional[str]):
+    """
+    Обновляет токен один раз на всех ожидающих: если его уже обновил
+    другой запрос, повторного обращения к IAM не будет.
+    """
+    async with _iam_lock:
+        if YANDEX_IAM_TOKEN == stale_token:
+            await get_iam_token()
 
 
 async def refresh_iam_token():
@@ -38,14 +186,13 @@ async def refresh_iam_token():
             logger.error(f"Error refreshing IAM token: {e}")
 
 
-def recognize_speech(audio_content, lang="ru-RU"):
+async def recognize_speech(audio_content, lang="ru-RU"):
     try:
-        if not YANDEX_IAM_TOKEN:
-            get_iam_token()
         url = f"https://stt.api.cloud.yandex.net/speech/v1/stt:recognize?folderId={YANDEX_FOLDER_ID}&lang={lang}"
-        headers = {"Authorization": f"Bearer {YANDEX_IAM_TOKEN}"}
 
-        response = requests.post(url, headers=headers, data=audio_content)
+        response = await _request(
+            "stt", url, timeout=YANDEX_STT_TIMEOUT, content=audio_content
+        )
 
         if response.status_code == 200:
             result = response.json().get("result")
@@ -75,7 +222,7 @@ def convert_mp3_to_aac(input_mp3, output_aac):
         print(f"Error: {e.stderr.decode('utf8')}")
 
 
-def synthesize_speech(text, lang_code):
+async def synthesize_speech(text, lang_code):
     try:
         logger.info(
             f"Starting synthesis for text: '{text[:100]}' with lang_code: '{lang_code}'"
@@ -86,7 +233,6 @@ def synthesize_speech(text, lang_code):
         }
         settings = voice_settings.get(lang_code, voice_settings["ru"])
         url = "https://tts.api.cloud.yandex.net/speech/v1/tts:synthesize"
-        headers = {"Authorization": f"Bearer {YANDEX_IAM_TOKEN}"}
 
         data = {
             "text": text,
@@ -98,55 +244,13 @@ def synthesize_speech(text, lang_code):
             "sampleRateHertz": 48000,
             "speed": "1.2",
         }
-        response = requests.post(url, headers=headers, data=data, stream=True)
+        response = await _request(
+            "tts", url, timeout=YANDEX_TTS_TIMEOUT, data=data
+        )
         if response.status_code == 200:
             logger.info(f"Audio response content: OK for text: '{text[:10]}'")
-
-            input_audio = io.BytesIO(response.content)
-            temp_input = tempfile.NamedTemporaryFile(
-                delete=False, suffix=".mp3"
-            )
-            temp_output = tempfile.NamedTemporaryFile(
-                delete=False, suffix=".aac"
-            )
-
-            with open(temp_input.name, "wb") as f:
-                f.write(input_audio.read())
-
-            # Попробуем сначала считать файл как MP3
-            try:
-                subprocess.run(
-                    [
-                        "ffmpeg",
-                        "-y",
-                        "-i",
-                        temp_input.name,
-                        "-c:a",
-                        "aac",
-                        temp_output.name,
-                    ],
-                    check=True,
-                )
-            except subprocess.CalledProcessError:
-                logger.warning(f"Failed to decode as mp3, trying as mp4")
-                # Если не удалось, пробуем считать файл как MP4
-                subprocess.run(
-                    [
-                        "ffmpeg",
-                        "-y",
-                        "-i",
-                        temp_input.name,
-                        "-f",
-                        "mp4",
-                        "-c:a",
-                        "aac",
-                        temp_output.name,
-                    ],
-                    check=True,
-                )
-
-            with open(temp_output.name, "rb") as f:
-                return f.read()
+            # ffmpeg работает в потоке, чтобы не блокировать event loop
+            return await asyncio.to_thread(_convert_to_aac, response.content)
 
         else:
             error_message = f"Failed to synthesize speech, status code: {response.status_code}, response text: {response.text[:200]}"
@@ -157,10 +261,60 @@ def synthesize_speech(text, lang_code):
         return None
 
 
-def translate_text(text, source_lang="ru", target_lang="kk"):
+def _convert_to_aac(mp3_content: bytes) -> bytes:
+    temp_input = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
+    temp_output = tempfile.NamedTemporaryFile(delete=False, suffix=".aac")
+    temp_input.close()
+    temp_output.close()
+    try:
+        with open(temp_input.name, "wb") as f:
+            f.write(mp3_content)
+
+        # Попробуем сначала считать файл как MP3
+        try:
+            subprocess.run(
+                [
+                    "ffmpeg",
+                    "-y",
+                    "-i",
+                    temp_input.name,
+                    "-c:a",
+                    "aac",
+                    temp_output.name,
+                ],
+                check=True,
+            )
+        except subprocess.CalledProcessError:
+            logger.warning(f"Failed to decode as mp3, trying as mp4")
+            # Если не удалось, пробуем считать файл как MP4
+            subprocess.run(
+                [
+                    "ffmpeg",
+                    "-y",
+                    "-i",
+                    temp_input.name,
+                    "-f",
+                    "mp4",
+                    "-c:a",
+                    "aac",
+                    temp_output.name,
+                ],
+                check=True,
+            )
+
+        with open(temp_output.name, "rb") as f:
+            return f.read()
+    finally:
+        for path in (temp_input.name, temp_output.name):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+async def translate_text(text, source_lang="ru", target_lang="kk"):
     url = "https://translate.api.cloud.yandex.net/translate/v2/translate"
     headers = {
-        "Authorization": f"Bearer {YANDEX_IAM_TOKEN}",
         "Content-Type": "application/json",
     }
     payload = {
@@ -171,7 +325,13 @@ def translate_text(text, source_lang="ru", target_lang="kk"):
     }
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = await _request(
+            "translate",
+            url,
+            timeout=YANDEX_TRANSLATE_TIMEOUT,
+            json=payload,
+            headers=headers,
+        )
         response.raise_for_status()
         translations = response.json().get("translations", [])
         if translations:
@@ -179,7 +339,7 @@ def translate_text(text, source_lang="ru", target_lang="kk"):
         else:
             logger.error("Translation not found in response")
             return "Перевод не найден."
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Error during translation request: {e}")
         return "Ошибка при запросе перевода."
     except Exception as e:
@@ -0,0 +1,130 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from utils.config import (
+    ADMISSION_QUEUE_TIMEOUT,
+    GPT_MAX_CONCURRENCY,
+    GPT_MAX_QUEUE,
+    STT_MAX_CONCURRENCY,
+    STT_MAX_QUEUE,
+    DB_MAX_CONCURRENCY,
+    DB_MAX_QUEUE,
+)
+
+
+class OverloadedError(Exception):
+    """
+    Зависимость перегружена: очередь ожидания заполнена или ожидание
+    превысило допустимое время. Клиенту стоит повторить запрос позже.
+    """
+
+    def __init__(self, dependency: str, retry_after: int):
+        super().__init__(f"{dependency} is overloaded")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Ограничение числа одновременных обращений к зависимости с ограниченной
+    очередью ожидания. При переполнении очереди запрос отклоняется сразу.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_hold = 0.0
+        self.completed = 0
+
+    def retry_after(self) -> int:
+        """
+        Оценка (в секундах), когда стоит повторить запрос: среднее время
+        обработки, умноженное на длину очереди в пересчёте на один слот.
+        """
+        avg_hold = self.total_hold / self.completed if self.completed else 1
+        backlog = (self.waiting + 1) / self.max_concurrency
+        return max(1, math.ceil(avg_hold * backlog))
+
+    def _reject(self):
+        self.rejected += 1
+        raise OverloadedError(self.name, self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self):
+        started = time.monotonic()
+        if not self._semaphore.locked():
+            # Свободный слот есть: захватывается без ожидания
+            await self._semaphore.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                self._reject()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(
+                    self._semaphore.acquire(), self.queue_timeout
+                )
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                self._reject()
+            finally:
+                self.waiting -= 1
+
+        acquired = time.monotonic()
+        wait = acquired - started
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_hold += time.monotonic() - acquired
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait": (
+                round(self.total_wait / self.admitted, 4)
+                if self.admitted
+                else 0.0
+            ),
+            "max_wait": round(self.max_wait, 4),
+        }
+
+
+gpt_limiter = AdmissionLimiter("gpt", GPT_MAX_CONCURRENCY, GPT_MAX_QUEUE)
+stt_limiter = AdmissionLimiter("stt", STT_MAX_CONCURRENCY, STT_MAX_QUEUE)
+db_limiter = AdmissionLimiter("db", DB_MAX_CONCURRENCY, DB_MAX_QUEUE)
+
+
+def get_admission_stats() -> dict:
+    return {
+        limiter.name: limiter.stats()
+        for limiter in (gpt_limiter, stt_limiter, db_limiter)
+    }
@@ -10,6 +10,129 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 DATABASE_URL = os.getenv("DATABASE_URL")
 URL_VERIFY_TOKEN = os.getenv("URL_VERIFY_TOKEN")
 
+# Время жизни привязки user_id к соединению, если в токене нет exp (секунды)
+AUTH_SESSION_DEFAULT_TTL = int(os.getenv("AUTH_SESSION_DEFAULT_TTL", "900"))
+# Кэш проверенных токенов: размер in-process кэша и общий кэш в Redis
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_TOKEN_CACHE_REDIS = os.getenv("AUTH_TOKEN_CACHE_REDIS", "false") == "true"
+# Режим проверки токена: "remote" (URL_VERIFY_TOKEN) или "local" (подпись JWT)
+AUTH_VERIFY_MODE = os.getenv("AUTH_VERIFY_MODE", "remote")
+AUTH_JWKS_URL = os.getenv("AUTH_JWKS_URL")
+AUTH_JWKS_REFRESH_INTERVAL = int(
+    os.getenv("AUTH_JWKS_REFRESH_INTERVAL", "3600")
+)
+AUTH_JWT_SECRET = os.getenv("AUTH_JWT_SECRET")
+# С общим секретом (AUTH_JWT_SECRET) подпись HMAC, иначе - ключи из JWKS
+AUTH_JWT_ALGORITHMS = os.getenv(
+    "AUTH_JWT_ALGORITHMS", "HS256" if AUTH_JWT_SECRET else "RS256"
+).split(",")
+AUTH_JWT_AUDIENCE = os.getenv("AUTH_JWT_AUDIENCE")
+AUTH_JWT_ISSUER = os.getenv("AUTH_JWT_ISSUER")
+AUTH_JWT_PHONE_CLAIM = os.getenv("AUTH_JWT_PHONE_CLAIM", "phone")
+
+# WebSocket-сервер. WS_WORKERS=0 - сервер работает в процессе FastAPI,
+# WS_WORKERS>0 - запускается N отдельных процессов на одном порту (SO_REUSEPORT)
+WS_HOST = os.getenv("WS_HOST", "0.0.0.0")
+WS_PORT = int(os.getenv("WS_PORT", "8083"))
+WS_WORKERS = int(os.getenv("WS_WORKERS", "0"))
+# Воркер, который подряд столько раз завершился быстрее
+# WS_WORKER_MIN_UPTIME секунд, больше не перезапускается
+WS_WORKER_MAX_RESTARTS = int(os.getenv("WS_WORKER_MAX_RESTARTS", "5"))
+WS_WORKER_MIN_UPTIME = float(os.getenv("WS_WORKER_MIN_UPTIME", "30"))
+# Ограничения на одновременные обращения к зависимостям (admission control).
+# Если очередь ожидания заполнена, запрос отклоняется с ошибкой "overloaded".
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+GPT_MAX_CONCURRENCY = int(os.getenv("GPT_MAX_CONCURRENCY", "32"))
+GPT_MAX_QUEUE = int(os.getenv("GPT_MAX_QUEUE", "64"))
+STT_MAX_CONCURRENCY = int(os.getenv("STT_MAX_CONCURRENCY", "16"))
+STT_MAX_QUEUE = int(os.getenv("STT_MAX_QUEUE", "32"))
+DB_MAX_CONCURRENCY = int(os.getenv("DB_MAX_CONCURRENCY", "15"))
+DB_MAX_QUEUE = int(os.getenv("DB_MAX_QUEUE", "200"))
+# Фоновые задачи: максимум одновременно существующих задач и сколько
+# секунд ждать их завершения при остановке
+TASK_SUPERVISOR_CAPACITY = int(os.getenv("TASK_SUPERVISOR_CAPACITY", "1000"))
+TASK_DRAIN_TIMEOUT = float(os.getenv("TASK_DRAIN_TIMEOUT", "15"))
+# Пакетная отложенная запись сообщений чата
+MESSAGE_WRITE_BEHIND = os.getenv("MESSAGE_WRITE_BEHIND", "true") == "true"
+MESSAGE_BATCH_SIZE = int(os.getenv("MESSAGE_BATCH_SIZE", "200"))
+MESSAGE_FLUSH_INTERVAL = float(os.getenv("MESSAGE_FLUSH_INTERVAL", "0.05"))
+MESSAGE_QUEUE_MAX = int(os.getenv("MESSAGE_QUEUE_MAX", "10000"))
+# Повторы записи пакета при ошибке БД, начальная задержка (секунды)
+MESSAGE_FLUSH_RETRIES = int(os.getenv("MESSAGE_FLUSH_RETRIES", "5"))
+MESSAGE_FLUSH_BACKOFF = float(os.getenv("MESSAGE_FLUSH_BACKOFF", "0.2"))
+# Максимум одновременно выполняемых кадров с request_id на одно соединение
+WS_MAX_INFLIGHT_REQUESTS = int(os.getenv("WS_MAX_INFLIGHT_REQUESTS", "4"))
+# Максимальный размер аудио, передаваемого бинарными кадрами (байт)
+AUDIO_UPLOAD_MAX_BYTES = int(
+    os.getenv("AUDIO_UPLOAD_MAX_BYTES", str(10 * 1024 * 1024))
+)
+# Перекодирование аудио перед распознаванием: pool (пул процессов-воркеров),
+# pipe (ffmpeg через каналы) или legacy (временные файлы, pydub)
+AUDIO_TRANSCODE_MODE = os.getenv("AUDIO_TRANSCODE_MODE", "pool")
+AUDIO_TRANSCODE_TIMEOUT = float(os.getenv("AUDIO_TRANSCODE_TIMEOUT", "30"))
+# Пул перекодирования: по умолчанию ядра делятся между процессами WS_WORKERS
+TRANSCODER_POOL_SIZE = int(
+    os.getenv(
+        "TRANSCODER_POOL_SIZE",
+        str(max(1, (os.cpu_count() or 1) // max(1, WS_WORKERS))),
+    )
+)
+TRANSCODER_QUEUE_SIZE = int(os.getenv("TRANSCODER_QUEUE_SIZE", "100"))
+TRANSCODER_HEALTH_INTERVAL = float(
+    os.getenv("TRANSCODER_HEALTH_INTERVAL", "30")
+)
+# Сколько задание может ждать свободного воркера (секунды)
+TRANSCODER_QUEUE_TIMEOUT = float(os.getenv("TRANSCODER_QUEUE_TIMEOUT", "30"))
+# Распознавание во время загрузки бинарного аудио: off, speechkit или local
+# (локальная замена без сети, возвращает STT_LOCAL_TRANSCRIPT)
+STT_STREAMING_BACKEND = os.getenv("STT_STREAMING_BACKEND", "off")
+STT_LOCAL_TRANSCRIPT = os.getenv("STT_LOCAL_TRANSCRIPT")
+# Кэш результатов распознавания по хэшу аудио и языку (повторные отправки)
+STT_CACHE_SIZE = int(os.getenv("STT_CACHE_SIZE", "1000"))
+STT_CACHE_TTL = int(os.getenv("STT_CACHE_TTL", "3600"))
+STT_CACHE_REDIS = os.getenv("STT_CACHE_REDIS", "false") == "true"
+# Запись ежедневного опроса: upsert (один запрос), redis (черновик в Redis,
+# перенос в Postgres по завершении опроса) или legacy
+SURVEY_WRITE_MODE = os.getenv("SURVEY_WRITE_MODE", "upsert")
+# Сколько черновик опроса хранится в Redis после своего срока (секунд)
+SURVEY_DRAFT_GRACE = int(os.getenv("SURVEY_DRAFT_GRACE", "86400"))
+SURVEY_SWEEP_INTERVAL = float(os.getenv("SURVEY_SWEEP_INTERVAL", "30"))
+# Через сколько секунд простоя удаляется очередь записи опроса пользователя
+SURVEY_ACTOR_IDLE_TIMEOUT = float(os.getenv("SURVEY_ACTOR_IDLE_TIMEOUT", "30"))
+# Кэш профилей пользователей (существование, язык, роль, время напоминания)
+USER_PROFILE_CACHE_SIZE = int(os.getenv("USER_PROFILE_CACHE_SIZE", "10000"))
+USER_PROFILE_CACHE_TTL = int(os.getenv("USER_PROFILE_CACHE_TTL", "300"))
+USER_PROFILE_CACHE_REDIS = (
+    os.getenv("USER_PROFILE_CACHE_REDIS", "false") == "true"
+)
+# Пул соединений с БД. pool_size + max_overflow не меньше DB_MAX_CONCURRENCY
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true") == "true"
+# Открывать DB_POOL_SIZE соединений при старте
+DB_POOL_WARMUP = os.getenv("DB_POOL_WARMUP", "true") == "true"
+# Кэши подготовленных запросов asyncpg (0 - для pgbouncer в режиме transaction)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(
+    os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "100")
+)
+# История чата: размер страницы по умолчанию и максимальный,
+# размер страницы, которыми история читается при потоковой выдаче
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "200"))
+HISTORY_STREAM_BATCH = int(os.getenv("HISTORY_STREAM_BATCH", "500"))
+# Клиент Yandex SpeechKit: общий HTTP/2-клиент, тайм-ауты на операцию
+# (секунды) и повторы при сетевых ошибках, 429 и 5xx
+YANDEX_HTTP2 = os.getenv("YANDEX_HTTP2", "true") == "true"
+YANDEX_MAX_CONNECTIONS = int(os.getenv("YANDEX_MAX_CONNECTIONS", "20"))
+YANDEX_STT_TIMEOUT = float(os.getenv("YANDEX_STT_TIMEOUT", "15"))
+YANDEX_TTS_TIMEOUT = float(os.getenv("YANDEX_TTS_TIMEOUT", "15"))
+YANDEX_TRANSLATE_TIMEOUT = float(os.getenv("YANDEX_TRANSLATE_TIMEOUT", "5"))
+YANDEX_MAX_RETRIES = int(os.getenv("YANDEX_MAX_RETRIES", "2"))
+YANDEX_RETRY_BACKOFF = float(os.getenv("YANDEX_RETRY_BACKOFF", "0.2"))
+
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_API_KEY_REALTIME = os.getenv("OPENAI_API_KEY_REALTIME")
 
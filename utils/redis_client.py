@@ -80,3 +80,92 @@ async def get_registration_status(user_id: str) -> bool:
             f"Error getting registration status for user {user_id}: {e}"
         )
         return False
+
+
+async def get_verified_token(token_hash: str):
+    """
+    Получает из Redis результат проверки токена (общий для всех узлов).
+    """
+    try:
+        user_data = await redis.get(f"verified_token:{token_hash}")
+        if user_data:
+            return json.loads(user_data)
+        return None
+    except Exception as e:
+        logger.error(f"Error getting verified token from Redis: {e}")
+        return None
+
+
+async def save_verified_token(token_hash: str, user_data: dict, ttl: int):
+    """
+    Сохраняет результат проверки токена в Redis до истечения срока токена.
+    """
+    try:
+        await redis.set(
+            f"verified_token:{token_hash}",
+            json.dumps(user_data, ensure_ascii=False),
+            ex=ttl,
+        )
+    except Exception as e:
+        logger.error(f"Error saving verified token to Redis: {e}")
+
+
+async def get_cached_user_profile(user_id: str):
+    """
+    Получает профиль пользователя из общего кэша в Redis.
+    """
+    try:
+        profile = await redis.get(f"user_profile:{user_id}")
+        if profile:
+            return json.loads(profile)
+        return None
+    except Exception as e:
+        logger.error(f"Error getting user profile from Redis: {e}")
+        return None
+
+
+async def save_cached_user_profile(user_id: str, profile: dict, ttl: int):
+    """
+    Сохраняет профиль пользователя в общий кэш в Redis.
+    """
+    try:
+        await redis.set(
+            f"user_profile:{user_id}",
+            json.dumps(profile, ensure_ascii=False),
+            ex=ttl,
+        )
+    except Exception as e:
+        logger.error(f"Error saving user profile to Redis: {e}")
+
+
+async def invalidate_cached_user_profile(user_id: str, channel: str):
+    """
+    Удаляет профиль из Redis и оповещает остальные процессы.
+    """
+    try:
+        await redis.delete(f"user_profile:{user_id}")
+        await redis.publish(channel, user_id)
+    except Exception as e:
+        logger.error(f"Error invalidating user profile in Redis: {e}")
+
+
+async def get_cached_transcript(key: str):
+    """
+    Получает текст распознанного аудио из общего кэша в Redis.
+    """
+    try:
+        transcript = await redis.get(f"stt_cache:{key}")
+        return transcript.decode() if transcript else None
+    except Exception as e:
+        logger.error(f"Error getting transcript from Redis: {e}")
+        return None
+
+
+async def save_cached_transcript(key: str, transcript: str, ttl: int):
+    """
+    Сохраняет текст распознанного аудио в общий кэш в Redis.
+    """
+    try:
+        await redis.set(f"stt_cache:{key}", transcript, ex=ttl)
+    except Exception as e:
+        logger.error(f"Error saving transcript to Redis: {e}")
@@ -0,0 +1,60 @@
+import hashlib
+from typing import Optional
+from utils.config import STT_CACHE_SIZE, STT_CACHE_TTL, STT_CACHE_REDIS
+from utils.redis_client import get_cached_transcript, save_cached_transcript
+from utils.ttl_cache import TTLCache
+
+
+class STTCache:
+    """
+    Кэш результатов распознавания речи. Ключ - sha256 декодированного
+    аудио и язык распознавания, поэтому повторно отправленный клип не
+    перекодируется и не распознаётся заново.
+
+    Первый уровень - LRU-кэш процесса с TTL, при STT_CACHE_REDIS
+    результаты дополнительно хранятся в Redis и доступны всем процессам.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = STT_CACHE_SIZE,
+        ttl: int = STT_CACHE_TTL,
+        use_redis: bool = STT_CACHE_REDIS,
+    ):
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.redis_hits = 0
+
+    @staticmethod
+    def key(audio, lang: str) -> str:
+        return f"{hashlib.sha256(audio).hexdigest()}:{lang}"
+
+    async def get(self, key: str) -> Optional[str]:
+        transcript = self._local.get(key)
+        if transcript is not None or not self.use_redis:
+            return transcript
+
+        transcript = await get_cached_transcript(key)
+        if transcript is not None:
+            self.redis_hits += 1
+            self._local.set(key, transcript)
+        return transcript
+
+    async def set(self, key: str, transcript: Optional[str]) -> None:
+        # Пустой результат не кэшируем: повтор может распознаться
+        if not transcript:
+            return
+        self._local.set(key, transcript)
+        if self.use_redis:
+            await save_cached_transcript(key, transcript, self.ttl)
+
+    def stats(self) -> dict:
+        return {
+            **self._local.stats(),
+            "redis": self.use_redis,
+            "redis_hits": self.redis_hits,
+        }
+
+
+stt_cache = STTCache()
@@ -0,0 +1,97 @@
+import asyncio
+from collections import defaultdict
+from utils.config import TASK_SUPERVISOR_CAPACITY
+from utils.logging_config import get_logger
+from utils.unit_of_work import detach_unit_of_work
+
+
+logger = get_logger(name="task_supervisor")
+
+
+class TaskSupervisor:
+    """
+    Учёт фоновых (fire-and-forget) задач.
+
+    Число одновременно существующих задач ограничено capacity: при
+    заполнении spawn ждёт освобождения места. Завершённые задачи удаляются
+    автоматически, ошибки логируются и считаются по видам задач.
+    При остановке drain дожидается незавершённых задач с ограничением
+    по времени.
+    """
+
+    def __init__(self, capacity: int = TASK_SUPERVISOR_CAPACITY):
+        self.capacity = capacity
+        self._slots = asyncio.Semaphore(capacity)
+        self._tasks: set[asyncio.Task] = set()
+        self.running = defaultdict(int)
+        self.finished = defaultdict(int)
+        self.failed = defaultdict(int)
+        self.cancelled = defaultdict(int)
+
+    async def spawn(self, coro, kind: str) -> asyncio.Task:
+        try:
+            await self._slots.acquire()
+        except asyncio.CancelledError:
+            coro.close()
+            raise
+
+        task = asyncio.create_task(self._run(coro, kind), name=kind)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, coro, kind: str):
+        # Фоновая задача переживает запрос и работает со своими сессиями БД
+        detach_unit_of_work()
+        self.running[kind] += 1
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            self.cancelled[kind] += 1
+            raise
+        except Exception as e:
+            self.failed[kind] += 1
+            logger.error(f"Background task '{kind}' failed: {e}")
+        finally:
+            self.running[kind] -= 1
+            self.finished[kind] += 1
+            self._slots.release()
+
+    async def drain(self, timeout: float) -> None:
+        """
+        Дожидается фоновых задач не дольше timeout секунд,
+        оставшиеся отменяет.
+        """
+        pending = set(self._tasks)
+        if not pending:
+            return
+
+        logger.info(f"Draining {len(pending)} background tasks")
+        _, pending = await asyncio.wait(pending, timeout=timeout)
+        if pending:
+            logger.error(
+                f"{len(pending)} background tasks did not finish in "
+                f"{timeout}s, cancelling"
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> dict:
+        kinds = set(self.running) | set(self.finished)
+        return {
+            "capacity": self.capacity,
+            "pending": len(self._tasks),
+            "by_kind": {
+                kind: {
+                    "running": self.running[kind],
+                    "finished": self.finished[kind],
+                    "failed": self.failed[kind],
+                    "cancelled": self.cancelled[kind],
+                }
+                for kind in sorted(kinds)
+            },
+        }
+
+
+supervisor = TaskSupervisor()
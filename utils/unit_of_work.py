@@ -0,0 +1,16 @@
+from contextvars import ContextVar
+
+
+# Единица работы с БД текущего запроса (см. Postgres.unit_of_work)
+current_unit_of_work: ContextVar = ContextVar(
+    "current_unit_of_work", default=None
+)
+
+
+def detach_unit_of_work() -> None:
+    """
+    Отвязывает текущую задачу от единицы работы запроса.
+    Вызывается в начале фоновых задач: они наследуют контекст запроса,
+    но должны работать со своими сессиями.
+    """
+    current_unit_of_work.set(None)
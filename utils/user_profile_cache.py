@@ -0,0 +1,98 @@
+import asyncio
+from typing import Optional
+from utils.config import (
+    USER_PROFILE_CACHE_SIZE,
+    USER_PROFILE_CACHE_TTL,
+    USER_PROFILE_CACHE_REDIS,
+)
+from utils.logging_config import get_logger
+from utils.redis_client import (
+    redis,
+    get_cached_user_profile,
+    save_cached_user_profile,
+    invalidate_cached_user_profile,
+)
+from utils.ttl_cache import TTLCache
+
+
+logger = get_logger(name="user_profile_cache")
+
+# Канал, по которому процессы сообщают друг другу об изменении профиля
+INVALIDATION_CHANNEL = "user_profile_invalidate"
+
+
+class UserProfileCache:
+    """
+    Кэш профилей пользователей: есть ли пользователь в БД, его язык,
+    роль и время напоминания.
+
+    Первый уровень - LRU-кэш процесса с TTL. При USER_PROFILE_CACHE_REDIS
+    профили дополнительно хранятся в Redis, а изменения рассылаются
+    остальным процессам через pub/sub.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = USER_PROFILE_CACHE_SIZE,
+        ttl: int = USER_PROFILE_CACHE_TTL,
+        use_redis: bool = USER_PROFILE_CACHE_REDIS,
+    ):
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.redis_hits = 0
+        self.invalidations = 0
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        profile = self._local.get(user_id)
+        if profile is not None or not self.use_redis:
+            return profile
+
+        profile = await get_cached_user_profile(user_id)
+        if profile is not None:
+            self.redis_hits += 1
+            self._local.set(user_id, profile)
+        return profile
+
+    async def set(self, user_id: str, profile: dict) -> None:
+        self._local.set(user_id, profile)
+        if self.use_redis:
+            await save_cached_user_profile(user_id, profile, self.ttl)
+
+    async def invalidate(self, user_id: str) -> None:
+        self.invalidations += 1
+        self._local.delete(user_id)
+        if self.use_redis:
+            await invalidate_cached_user_profile(user_id, INVALIDATION_CHANNEL)
+
+    async def listen_invalidations(self):
+        """
+        Удаляет из кэша процесса профили, изменённые другими процессами.
+        """
+        while True:
+            pubsub = redis.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._local.delete(message["data"].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"User profile invalidation listener failed: {e}")
+                # Пока подписки не было, кэш мог устареть
+                self._local.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+
+    def stats(self) -> dict:
+        return {
+            **self._local.stats(),
+            "redis": self.use_redis,
+            "redis_hits": self.redis_hits,
+            "invalidations": self.invalidations,
+        }
+
+
+user_profiles = UserProfileCache()
@@ -0,0 +1,213 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from utils.config import (
+    WS_WORKERS,
+    WS_WORKER_MAX_RESTARTS,
+    WS_WORKER_MIN_UPTIME,
+    TASK_DRAIN_TIMEOUT,
+)
+from utils.logging_config import get_logger
+
+
+logger = get_logger(name="ws_workers")
+
+# Поля, которые каждый воркер публикует в общую память
+STATS_FIELDS = (
+    "active_connections",
+    "total_connections",
+    "frames_received",
+    "db_checked_out",
+    "db_waiting",
+    "updated_at",
+)
+STATS_PUBLISH_INTERVAL = 1
+
+
+async def publish_stats(index, shared_stats):
+    """
+    Периодически копирует счётчики воркера в общую память.
+    """
+    from server import connection_stats
+    from services.database import get_pool_stats
+
+    offset = index * len(STATS_FIELDS)
+    while True:
+        pool_stats = get_pool_stats()
+        values = {
+            **connection_stats,
+            "db_checked_out": pool_stats["checked_out"],
+            "db_waiting": pool_stats["waiting"],
+            "updated_at": int(time.time()),
+        }
+        for i, field in enumerate(STATS_FIELDS):
+            shared_stats[offset + i] = values[field]
+        await asyncio.sleep(STATS_PUBLISH_INTERVAL)
+
+
+async def worker_main(index, shared_stats) -> int:
+    """
+    Работает до SIGTERM. Код возврата 1 - сервер не запустился
+    (например, не удалось занять порт) или остановился сам.
+    """
+    from server import main as websocket_server
+    from services.message_writer import message_writer
+    from services.transcoder_pool import transcoder_pool
+    from utils.task_supervisor import supervisor
+
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+
+    asyncio.create_task(publish_stats(index, shared_stats))  # noqa
+    server_task = asyncio.create_task(websocket_server(reuse_port=True))
+    stop_task = asyncio.create_task(stop.wait())
+    await asyncio.wait(
+        {server_task, stop_task}, return_when=asyncio.FIRST_COMPLETED
+    )
+    exit_code = 0
+    if server_task.done():
+        logger.error(f"WebSocket worker {index}: server is not running")
+        exit_code = 1
+    stop_task.cancel()
+
+    # При остановке дожидаемся фоновых записей в БД
+    server_task.cancel()
+    await supervisor.drain(TASK_DRAIN_TIMEOUT)
+    await message_writer.stop()
+    await transcoder_pool.stop()
+    return exit_code
+
+
+def run_worker(index, shared_stats):
+    """
+    Точка входа процесса-воркера: собственный event loop и свой сервер,
+    слушающий общий порт через SO_REUSEPORT.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sys.exit(asyncio.run(worker_main(index, shared_stats)))
+
+
+class WorkerPool:
+    """
+    Набор процессов WebSocket-сервера. Упавшие воркеры перезапускаются;
+    воркер, который раз за разом падает сразу после запуска (например,
+    порт занят), после max_restarts попыток подряд остаётся остановленным.
+    """
+
+    def __init__(
+        self,
+        workers: int = WS_WORKERS,
+        max_restarts: int = WS_WORKER_MAX_RESTARTS,
+        min_uptime: float = WS_WORKER_MIN_UPTIME,
+    ):
+        self.workers = workers
+        self.max_restarts = max_restarts
+        self.min_uptime = min_uptime
+        self._ctx = multiprocessing.get_context("spawn")
+        self._shared_stats = self._ctx.Array("q", workers * len(STATS_FIELDS))
+        self._processes: list = [None] * workers
+        self._started_at = [0.0] * workers
+        self._quick_failures = [0] * workers
+        self.restarts = [0] * workers
+        self.given_up = [False] * workers
+        self._monitor_task = None
+
+    def _start_worker(self, index):
+        process = self._ctx.Process(
+            target=run_worker,
+            args=(index, self._shared_stats),
+            name=f"ws-worker-{index}",
+            # Не демон: воркеру нужны собственные процессы (пул
+            # перекодирования), остановка - явно через stop()
+            daemon=False,
+        )
+        process.start()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info(f"Started WebSocket worker {index} (pid {process.pid})")
+
+    def start(self):
+        for index in range(self.workers):
+            self._start_worker(index)
+        self._monitor_task = asyncio.create_task(self.monitor())
+
+    async def monitor(self, interval: float = 5):
+        while True:
+            await asyncio.sleep(interval)
+            for index, process in enumerate(self._processes):
+                if (
+                    process is None
+                    or process.is_alive()
+                    or self.given_up[index]
+                ):
+                    continue
+                uptime = time.monotonic() - self._started_at[index]
+                if uptime < self.min_uptime:
+                    self._quick_failures[index] += 1
+                else:
+                    self._quick_failures[index] = 0
+                if self._quick_failures[index] > self.max_restarts:
+                    self.given_up[index] = True
+                    logger.error(
+                        f"WebSocket worker {index} exited with code "
+                        f"{process.exitcode} after {uptime:.1f}s, "
+                        f"{self.max_restarts} quick restarts failed, "
+                        "giving up"
+                    )
+                    continue
+                logger.error(
+                    f"WebSocket worker {index} exited with code "
+                    f"{process.exitcode}, restarting"
+                )
+                self.restarts[index] += 1
+                self._start_worker(index)
+
+    async def stop(self, timeout: float = TASK_DRAIN_TIMEOUT + 5):
+        if self._monitor_task:
+            self._monitor_task.cancel()
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        # join блокирует, поэтому ждём воркеры в потоках, не останавливая
+        # event loop (в нём ещё идёт остановка FastAPI)
+        await asyncio.gather(
+            *[
+                asyncio.to_thread(process.join, timeout)
+                for process in self._processes
+                if process is not None
+            ]
+        )
+
+    def stats(self) -> list[dict]:
+        result = []
+        for index, process in enumerate(self._processes):
+            offset = index * len(STATS_FIELDS)
+            values = self._shared_stats[offset : offset + len(STATS_FIELDS)]
+            result.append(
+                {
+                    "worker": index,
+                    "pid": process.pid if process else None,
+                    "alive": bool(process and process.is_alive()),
+                    "restarts": self.restarts[index],
+                    "given_up": self.given_up[index],
+                    **dict(zip(STATS_FIELDS, values)),
+                }
+            )
+        return result
+
+
+async def main():
+    pool = WorkerPool(WS_WORKERS or os.cpu_count())
+    pool.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await pool.stop()
+
+
+if __name__ == "__main__":
+    # Отдельный запуск WebSocket-воркеров без FastAPI
+    asyncio.run(main())